@@ -1,6 +1,9 @@
-from collections import deque
 from enum import Enum
 
+import numpy as np
+
+from agents.replay_memory import ReplayMemory, PrioritizedReplayMemory, MEMORY_SIZE
+
 """
 States:
     - Tank 1 location
@@ -36,6 +39,66 @@ class ActionEnum:
     RIGHT = 6
 
 
+class MacroAction:
+    """
+    One decision that turns the dials several units and/or fires, for Simulation.step().
+
+    The dials change by angle/power units, or to angle/power when absolute (None leaves that dial alone).
+    """
+    def __init__(self, angle=0, power=0, fire=False, absolute=False):
+        self._angle = angle
+        self._power = power
+        self._fire = fire
+        self._absolute = absolute
+
+    def fires(self):
+        return self._fire
+
+    def get_unit_actions(self, power, angle):
+        """
+        The ActionEnum steps this macro is made of, power first then angle (the order DumbAgent turns them in)
+        then FIRE.
+
+        :param power: the tank's power now
+        :param angle: the tank's angle now
+        """
+        power_change = self._change(self._power, power)
+        angle_change = self._change(self._angle, angle)
+
+        actions = [ActionEnum.INC_PWR if power_change > 0 else ActionEnum.DEC_PWR] * abs(power_change)
+        actions += [ActionEnum.INC_ANG if angle_change > 0 else ActionEnum.DEC_ANG] * abs(angle_change)
+        if self._fire:
+            actions.append(ActionEnum.FIRE)
+        return actions
+
+    def get_primary_action(self, power, angle):
+        """
+        The first unit action of the macro, what a guide's suggestion is compared with. None if it does nothing.
+        """
+        actions = self.get_unit_actions(power, angle)
+        return actions[0] if actions else None
+
+    def _change(self, dial, now):
+        # None leaves the dial alone, relative or absolute
+        if dial is None:
+            return 0
+        if not self._absolute:
+            return int(round(dial))
+        return int(round(dial - now))
+
+    def __repr__(self):
+        return 'MacroAction(angle=' + str(self._angle) + ', power=' + str(self._power) + ', fire=' + \
+               str(self._fire) + ', absolute=' + str(self._absolute) + ')'
+
+
+MACRO_STEPS = (1, 5, 15)
+
+# Discrete macro actions for a Q network, an action index picks one of these
+MACRO_ACTIONS = [MacroAction(fire=True)] + \
+                [MacroAction(angle=sign*step) for step in MACRO_STEPS for sign in (1, -1)] + \
+                [MacroAction(power=sign*step) for step in MACRO_STEPS for sign in (1, -1)]
+
+
 class StateEnum:
 
     TANK1_LOCATION_X = 0
@@ -52,19 +115,37 @@ class StateEnum:
 
 
 class BaseAgent:
-    def __init__(self):
-
-        self._memory = deque(maxlen=2000)
+    def __init__(self, memory_size=MEMORY_SIZE, prioritized_replay=False, replay_options=None):
+        """
+        :param replay_options: keyword arguments for PrioritizedReplayMemory (alpha, alpha_end, beta, beta_end,
+                               anneal_steps), None for its defaults
+        """
+        if prioritized_replay:
+            self._memory = PrioritizedReplayMemory(memory_size, **(replay_options or {}))
+        else:
+            self._memory = ReplayMemory(memory_size)
 
     def remember(self, state, action, reward, next_state, done):
-        self._memory.append((state, action, reward, next_state, done))
+        self._memory.add(state, action, reward, next_state, done)
 
     def act(self, state):
         pass
 
+    def act_batch(self, states):
+        """
+        One action per row of states, e.g. for the games of a VecEnv.
+        """
+        return np.array([self.act(state[None, :]) for state in states])
+
     def replay(self, batch_size):
         pass
 
+    def get_weights(self):
+        return None
+
+    def set_weights(self, weights):
+        pass
+
     def load(self, name):
         pass
 
@@ -0,0 +1,125 @@
+import os
+import random
+
+import numpy as np
+
+from agents import BaseAgent, MEMORY_SIZE
+from agents import mlp
+
+
+class BaseDqnAgent(BaseAgent):
+    """
+    Deep Q learning with a 24-24 Dense network, independent of what runs the network.
+
+    Subclasses build, run and train the network (_build_model, _predict_batch, _train_batch) and load/save it.
+    Acting always goes through a NumPy copy of the weights, see _mirror_weights().
+    """
+    WEIGHT_FILE_TYPES = ('.hdf5',)  # Endings load() reads, the first is what trainer.py saves
+
+    def __init__(self, state_size, action_size, force_continue=False, load_weights=False, gradient_steps=1,
+                 memory_size=MEMORY_SIZE, prioritized_replay=False, replay_options=None):
+        BaseAgent.__init__(self, memory_size, prioritized_replay, replay_options)
+
+        self._state_size = state_size
+        self._action_size  = action_size
+
+        self._gamma = 0.95
+        self._epsilon = 1.0 if not force_continue else 0.01
+        self._epsilon_decay = 0.995
+        self._epsilon_min = 0.01
+
+        self._learning_rate = 0.001
+        self._gradient_steps = gradient_steps  # Minibatches trained on per replay()
+        self._inference_weights = None  # NumPy copy of the model's weights, for acting
+
+        self._build_model()
+        self._mirror_weights()
+
+        # Load up known weights
+        max_file_number = 0
+        if load_weights or force_continue:
+            file_loaded = None
+            for file in os.listdir('models'):
+                file_without_ending, ending = os.path.splitext(file)
+                if ending not in self.WEIGHT_FILE_TYPES:
+                    continue
+
+                file_number = int(file_without_ending.split('_')[1])
+                if file_loaded is None or file_number > max_file_number:
+                    max_file_number = file_number
+                    file_loaded = os.path.join('models', file)
+
+            if file_loaded is not None:
+                print("Loading file " + str(file_loaded) + " to continue training.")
+                self.load(file_loaded)
+
+        self.restart_file_number_offset = max_file_number
+
+    def _build_model(self):
+        pass
+
+    def _predict_batch(self, states):
+        """
+        :return: Q values of the states, (batch, action size)
+        """
+        pass
+
+    def _train_batch(self, states, targets, sample_weight):
+        """
+        One gradient step towards the targets, with optional per state loss weights.
+        """
+        pass
+
+    def get_epsilon(self):
+        return self._epsilon
+
+    def set_epsilon(self, epsilon):
+        self._epsilon = epsilon
+
+    def get_memory(self):
+        return self._memory
+
+    def act(self, state):
+        if np.random.rand() <= self._epsilon:
+            # Explore
+            return random.randrange(self._action_size)
+
+        # Exploit
+        act_values = mlp.forward(self._inference_weights, state)
+        return np.argmax(act_values[0])
+
+    def act_batch(self, states):
+        # Exploit all at once, then explore where the dice say so
+        actions = np.argmax(mlp.forward(self._inference_weights, states), axis=1)
+        explore = np.random.rand(len(actions)) <= self._epsilon
+        actions[explore] = np.random.randint(self._action_size, size=np.count_nonzero(explore))
+        return actions
+
+    def replay(self, batch_size):
+        for _ in range(self._gradient_steps):
+            # Sample from memory, with the loss weights that go with the sampling
+            indices = self._memory.sample_indices(batch_size)
+            states, actions, rewards, next_states, dones = self._memory.get(indices)
+            weights = self._memory.importance_weights(indices)
+
+            # Target is the reward, plus the discounted best future reward (max Q of a') if the game goes on
+            future = np.amax(self._predict_batch(next_states), axis=1)
+            targets = rewards + self._gamma * future * ~dones
+
+            # Map the current states to their predictions, with the target swapped in for the action taken
+            targets_f = np.array(self._predict_batch(states))
+            td_errors = targets - targets_f[np.arange(batch_size), actions]
+            targets_f[np.arange(batch_size), actions] = targets
+
+            # One gradient step on the whole minibatch; fit decreases loss btwn targets_f and y_hat
+            self._train_batch(states, targets_f, weights)
+            self._memory.update_priorities(indices, td_errors)
+
+        self._mirror_weights()
+
+        # Decay the epsilon value to increase exploitation
+        if self._epsilon > self._epsilon_min:
+            self._epsilon *= self._epsilon_decay
+
+    def _mirror_weights(self):
+        self._inference_weights = [np.asarray(weights, dtype=np.float32) for weights in self.get_weights()]
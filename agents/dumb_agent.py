@@ -1,13 +1,31 @@
 import random
 
+import numpy as np
+
 from agents import BaseAgent, ActionEnum, StateEnum
 from sprites import X, Y
+from sprites.tank import MIN_ANGLE, MAX_ANGLE
+
+FIRST_SHOT_POWER = 75
+FIRST_SHOT_ANGLE = 135
+EXPLORATION_VALUE = 10  # Starting max power correction, in power units
+EXPLORATION_DECAY = 0.9  # Per shot
 
 
 class DumbAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, seed=None, landing_table=None, aim_angles=None):
+        """
+        :param landing_table: a LandingTable for this game's terrain - aim every shot with it instead of walking
+                              the power in by trial shots
+        :param aim_angles: angles the landing table may aim with, None for FIRST_SHOT_ANGLE pointed at the enemy
+        """
         BaseAgent.__init__(self)
 
+        self._random = random.Random(seed)
+
+        self._landing_table = landing_table
+        self._aim_angles = aim_angles
+
         self._first_shot = True
         self._last_shot_pwr = 0
         self._last_shot_ang = 0
@@ -20,14 +38,14 @@ class DumbAgent(BaseAgent):
 
         self._ready_to_fire = True
 
-        self._exploration_value = 10
+        self._exploration_value = EXPLORATION_VALUE
 
     def last_impact(self, location):
         self._last_impact[X] = location[X]
         self._last_impact[Y] = location[Y]
 
         # Lets decay our exploration value with shots
-        self._exploration_value *= 0.9
+        self._exploration_value *= EXPLORATION_DECAY
 
         if self._exploration_value < 1:
             self._exploration_value = 1
@@ -40,7 +58,12 @@ class DumbAgent(BaseAgent):
         :return:
         """
 
-        if self._first_shot:
+        if self._landing_table is not None:
+            # Look the shot up, once per shot
+            if self._first_shot or not self._ready_to_fire:
+                self._target_pwr, self._target_ang = self._aim(state, target_offset)
+                self._ready_to_fire = True
+        elif self._first_shot:
             # If its our first shot, lets randomly guess at the location to shoot at
             self._target_pwr, self._target_ang = self._generate_first_shot([state[StateEnum.TANK1_LOCATION_X+target_offset], state[StateEnum.TANK1_LOCATION_Y+target_offset]])
         else:
@@ -50,11 +73,11 @@ class DumbAgent(BaseAgent):
             if not self._ready_to_fire:
                 if self._last_impact[X] > state[StateEnum.TANK1_LOCATION_X+target_offset]:
                     # We impacted to the right, increase power and try again
-                    self._target_pwr += 1 * random.randint(1, int(self._exploration_value))
+                    self._target_pwr += 1 * self._random.randint(1, int(self._exploration_value))
                     self._ready_to_fire = True
                 elif self._last_impact[X] < state[StateEnum.TANK1_LOCATION_X+target_offset]:
                     # We impacted to the right, increase power and try again
-                    self._target_pwr -= 1 * random.randint(1, int(self._exploration_value))
+                    self._target_pwr -= 1 * self._random.randint(1, int(self._exploration_value))
                     self._ready_to_fire = True
 
         # Return an action - Adjust Power and angle to target values
@@ -80,9 +103,102 @@ class DumbAgent(BaseAgent):
         return action
 
     def _generate_first_shot(self, enemy_location):
-        pwr = 75
-        ang = 135
+        pwr = FIRST_SHOT_POWER
+        ang = FIRST_SHOT_ANGLE
 
         # Do random math
 
         return pwr, ang
+
+    def _aim(self, state, target_offset):
+        location = [state[StateEnum.TANK2_LOCATION_X-target_offset], state[StateEnum.TANK2_LOCATION_Y-target_offset]]
+        enemy_location = [state[StateEnum.TANK1_LOCATION_X+target_offset],
+                          state[StateEnum.TANK1_LOCATION_Y+target_offset]]
+
+        angles = self._aim_angles
+        if angles is None:
+            # FIRST_SHOT_ANGLE leans left, mirror it for an enemy to the right
+            mirrored = MAX_ANGLE + MIN_ANGLE - FIRST_SHOT_ANGLE
+            angles = [FIRST_SHOT_ANGLE if enemy_location[X] < location[X] else mirrored]
+
+        shot = self._landing_table.aim(location, enemy_location, angles)
+        if shot is None:
+            # Nowhere to land, fall back to the usual first shot
+            return self._generate_first_shot(enemy_location)
+        angle, power = shot
+        return power, angle
+
+
+class BatchDumbAgent:
+    """
+    DumbAgent for many games at once, one entry per game in each array. Used by VecEnv.
+    """
+    def __init__(self, size, seed=None):
+        self._random = np.random.default_rng(seed)
+
+        self._first_shot = np.ones(size, dtype=bool)
+        self._target_pwr = np.zeros(size, dtype=np.int64)
+        self._target_ang = np.zeros(size, dtype=np.int64)
+        self._last_impact_x = np.zeros(size, dtype=np.int64)
+        self._ready_to_fire = np.ones(size, dtype=bool)
+        self._exploration_value = np.full(size, float(EXPLORATION_VALUE))
+
+    def reset(self, games):
+        self._first_shot[games] = True
+        self._target_pwr[games] = 0
+        self._target_ang[games] = 0
+        self._last_impact_x[games] = 0
+        self._ready_to_fire[games] = True
+        self._exploration_value[games] = EXPLORATION_VALUE
+
+    def last_impact(self, games, impact_x):
+        self._last_impact_x[games] = impact_x
+
+        # Lets decay our exploration value with shots
+        self._exploration_value[games] = np.maximum(self._exploration_value[games] * EXPLORATION_DECAY, 1)
+
+    def update_targets(self, games, enemy_x):
+        """
+        Pick the power and angle to shoot with next, the first half of DumbAgent.act().
+        """
+        first = self._first_shot[games]
+        self._target_pwr[games[first]] = FIRST_SHOT_POWER
+        self._target_ang[games[first]] = FIRST_SHOT_ANGLE
+
+        # After a shot, walk the power toward the target by a random amount
+        adjust = ~first & ~self._ready_to_fire[games]
+        correction = self._random.integers(1, self._exploration_value[games].astype(np.int64) + 1)
+        over = adjust & (self._last_impact_x[games] > enemy_x)
+        under = adjust & (self._last_impact_x[games] < enemy_x)
+        self._target_pwr[games[over]] += correction[over]
+        self._target_pwr[games[under]] -= correction[under]
+        self._ready_to_fire[games[over | under]] = True
+
+    def get_targets(self, games):
+        return self._target_pwr[games], self._target_ang[games]
+
+    def fired(self, games):
+        self._first_shot[games] = False
+        self._ready_to_fire[games] = False
+
+    def act(self, games, power, angle, enemy_x):
+        """
+        DumbAgent.act() for the given games - an ActionEnum value per game.
+
+        :param games: indices of the games to act in
+        :param power: own gun power in each of those games
+        :param angle: own gun angle in each of those games
+        :param enemy_x: x location of the tank to shoot at in each of those games
+        """
+        self.update_targets(games, enemy_x)
+
+        # Adjust Power and angle to target values
+        target_pwr, target_ang = self.get_targets(games)
+        action = np.select(
+            [power > target_pwr, power < target_pwr, angle > target_ang, angle < target_ang],
+            [ActionEnum.DEC_PWR, ActionEnum.INC_PWR, ActionEnum.DEC_ANG, ActionEnum.INC_ANG],
+            ActionEnum.FIRE
+        )
+
+        self.fired(games[action == ActionEnum.FIRE])
+        return action
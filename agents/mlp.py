@@ -0,0 +1,149 @@
+import numpy as np
+
+"""
+NumPy version of the agents' small fully connected Q networks, so acting does not go through a framework call.
+
+Weights are a list of [kernel, bias, kernel, bias, ...], one pair per Dense layer, in the order and shapes Keras'
+get_weights() gives them. Hidden layers are relu, the output layer is linear.
+"""
+
+
+def forward(weights, states):
+    """
+    Q values of a batch of states.
+
+    :param weights: [kernel, bias, ...] of the network
+    :param states: (batch, state size)
+    :return: (batch, action size)
+    """
+    out = np.asarray(states, dtype=np.float32)
+    output_layer = len(weights) - 2
+    for layer in range(0, len(weights), 2):
+        out = out @ weights[layer] + weights[layer + 1]
+        if layer != output_layer:
+            out = np.maximum(out, 0.0)
+    return out
+
+
+def init_weights(layer_sizes, rng):
+    """
+    Glorot uniform kernels and zero biases, the same start as new Keras Dense layers.
+
+    :param layer_sizes: [input size, hidden size, ..., output size]
+    :param rng: np.random.Generator
+    """
+    weights = []
+    for fan_in, fan_out in zip(layer_sizes[:-1], layer_sizes[1:]):
+        limit = np.sqrt(6.0 / (fan_in + fan_out))
+        weights.append(rng.uniform(-limit, limit, (fan_in, fan_out)).astype(np.float32))
+        weights.append(np.zeros(fan_out, dtype=np.float32))
+    return weights
+
+
+def mse_gradients(weights, states, targets, sample_weight=None):
+    """
+    Mean squared error of a batch, averaged over the outputs then over the batch like Keras does, and its
+    gradient for every weight.
+
+    :param sample_weight: optional per state loss weights
+    :return: (loss, gradients in the same order and shapes as weights)
+    """
+    # Forward, keeping what went into each layer
+    layer_inputs = []
+    out = np.asarray(states, dtype=np.float32)
+    output_layer = len(weights) - 2
+    for layer in range(0, len(weights), 2):
+        layer_inputs.append(out)
+        out = out @ weights[layer] + weights[layer + 1]
+        if layer != output_layer:
+            out = np.maximum(out, 0.0)
+
+    batch, outputs = out.shape
+    scale = np.ones(batch, dtype=np.float32) if sample_weight is None else np.asarray(sample_weight, np.float32)
+    errors = out - targets
+    loss = float(np.sum(np.mean(errors**2, axis=1) * scale) / batch)
+
+    # Backward
+    gradients = [None] * len(weights)
+    delta = (errors * (2.0 / (outputs * batch)) * scale[:, None]).astype(np.float32)
+    for layer in range(output_layer, -1, -2):
+        layer_input = layer_inputs[layer // 2]
+        gradients[layer] = layer_input.T @ delta
+        gradients[layer + 1] = delta.sum(axis=0)
+        if layer > 0:
+            # Through the relu that made this layer's input
+            delta = (delta @ weights[layer].T) * (layer_input > 0)
+
+    return loss, gradients
+
+
+class Adam:
+    """
+    Adam optimizer with Keras' default settings, updating the weights in place.
+    """
+    def __init__(self, weights, learning_rate=0.001, beta_1=0.9, beta_2=0.999, epsilon=1e-7):
+        self._learning_rate = learning_rate
+        self._beta_1 = beta_1
+        self._beta_2 = beta_2
+        self._epsilon = epsilon
+
+        self._steps = 0
+        self._m = [np.zeros_like(w) for w in weights]
+        self._v = [np.zeros_like(w) for w in weights]
+
+    def step(self, weights, gradients):
+        self._steps += 1
+        learning_rate = self._learning_rate * np.sqrt(1.0 - self._beta_2**self._steps) / \
+            (1.0 - self._beta_1**self._steps)
+
+        for w, g, m, v in zip(weights, gradients, self._m, self._v):
+            m *= self._beta_1
+            m += (1.0 - self._beta_1) * g
+            v *= self._beta_2
+            v += (1.0 - self._beta_2) * g * g
+            w -= (learning_rate * m / (np.sqrt(v) + self._epsilon)).astype(w.dtype)
+
+
+def load_weights(name):
+    """
+    Read weights saved by save_weights(), or by Keras' save_weights() for a Dense stack (needs h5py).
+    """
+    if name.endswith('.npz'):
+        with np.load(name) as saved:
+            return [saved['arr_' + str(i)] for i in range(len(saved.files))]
+
+    import h5py
+    weights = []
+    with h5py.File(name, 'r') as saved:
+        for layer_name in saved.attrs['layer_names']:
+            layer = saved[_text(layer_name)]
+            for weight_name in layer.attrs['weight_names']:
+                weights.append(np.array(layer[_text(weight_name)]))
+    return weights
+
+
+def save_weights(name, weights):
+    """
+    Write weights to a .npz, or anything else to an HDF5 file Keras can load_weights() (needs h5py).
+    """
+    if name.endswith('.npz'):
+        np.savez(name, *weights)
+        return
+
+    import h5py
+    layer_names = ['dense_' + str(layer // 2 + 1) for layer in range(0, len(weights), 2)]
+    with h5py.File(name, 'w') as saved:
+        saved.attrs['layer_names'] = np.array([layer_name.encode('utf8') for layer_name in layer_names])
+        saved.attrs['backend'] = b'tensorflow'
+        saved.attrs['keras_version'] = b'2.2.4'
+        for layer_name, kernel, bias in zip(layer_names, weights[0::2], weights[1::2]):
+            weight_names = [layer_name + '/kernel:0', layer_name + '/bias:0']
+            layer = saved.create_group(layer_name)
+            layer.attrs['weight_names'] = np.array([weight_name.encode('utf8') for weight_name in weight_names])
+            layer[weight_names[0]] = kernel
+            layer[weight_names[1]] = bias
+
+
+def _text(name):
+    # HDF5 attribute strings can come back as bytes or str
+    return name.decode('utf8') if isinstance(name, bytes) else name
@@ -0,0 +1,49 @@
+import numpy as np
+
+from agents.base_dqn_agent import BaseDqnAgent
+from agents import mlp
+
+
+class NumpyDqnAgent(BaseDqnAgent):
+    """
+    BaseDqnAgent with the network, backprop and Adam in plain NumPy - no TensorFlow to import.
+
+    Saves .npz files, and reads those or the .hdf5 files DqnAgent saves (reading/writing .hdf5 needs h5py).
+    """
+    WEIGHT_FILE_TYPES = ('.npz', '.hdf5')
+
+    def __init__(self, state_size, action_size, seed=None, **kwargs):
+        self._random = np.random.default_rng(seed)
+        self._weights = None
+        self._optimizer = None
+        BaseDqnAgent.__init__(self, state_size, action_size, **kwargs)
+
+    def _build_model(self):
+        # Same layers as DqnAgent: state -> 24 relu -> 24 relu -> linear Q value per action
+        self._weights = mlp.init_weights([self._state_size, 24, 24, self._action_size], self._random)
+        self._optimizer = mlp.Adam(self._weights, learning_rate=self._learning_rate)
+
+    def _predict_batch(self, states):
+        return mlp.forward(self._weights, states)
+
+    def _train_batch(self, states, targets, sample_weight):
+        _, gradients = mlp.mse_gradients(self._weights, states, targets, sample_weight)
+        self._optimizer.step(self._weights, gradients)
+
+    def get_weights(self):
+        return [weights.copy() for weights in self._weights]
+
+    def set_weights(self, weights):
+        for current, new in zip(self._weights, weights):
+            current[...] = new
+        self._mirror_weights()
+
+    def load(self, name):
+        self.set_weights(mlp.load_weights(name))
+
+    def save(self, name):
+        mlp.save_weights(name, self._weights)
+
+    def _mirror_weights(self):
+        # Already NumPy, act on the live weights
+        self._inference_weights = self._weights
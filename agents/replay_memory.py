@@ -0,0 +1,214 @@
+import numpy as np
+
+MEMORY_SIZE = 100000
+
+# Prioritized replay
+PRIORITY_ALPHA = 0.6
+PRIORITY_BETA = 0.4
+PRIORITY_EPSILON = 1e-6  # Keeps transitions with no TD error sampleable
+ANNEAL_STEPS = 10000
+
+
+class ReplayMemory:
+    """
+    Ring buffer of (state, action, reward, next_state, done) transitions, kept in one preallocated NumPy array
+    per column. Once full, the oldest transition is overwritten.
+
+    The columns are allocated on the first add(), sized from that state, so an agent that never remembers
+    anything (e.g. a rollout worker's) never pays for them.
+    """
+    def __init__(self, capacity=MEMORY_SIZE, seed=None):
+        """
+        :param capacity: max number of transitions kept
+        :param seed: seed for sampling, None for random
+        """
+        self._capacity = capacity
+        self._random = np.random.default_rng(seed)
+
+        self._states = None
+        self._actions = None
+        self._rewards = None
+        self._next_states = None
+        self._dones = None
+
+        self._next_index = 0  # Where the next transition goes
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def get_capacity(self):
+        return self._capacity
+
+    def add(self, state, action, reward, next_state, done):
+        """
+        Store one transition, states can be any shape (e.g. [1, state_size]) and are kept flattened.
+
+        :return: index the transition was stored at
+        """
+        state = np.ravel(state)
+        if self._states is None:
+            self._allocate(state.size)
+
+        index = self._next_index
+        self._states[index] = state
+        self._actions[index] = action
+        self._rewards[index] = reward
+        self._next_states[index] = np.ravel(next_state)
+        self._dones[index] = done
+
+        self._next_index = (index + 1) % self._capacity
+        self._size = min(self._size + 1, self._capacity)
+        return index
+
+    def sample_indices(self, batch_size):
+        """
+        Pick batch_size different stored transitions, uniformly.
+        """
+        assert batch_size <= self._size, "Cannot sample " + str(batch_size) + " of " + str(self._size) + " transitions."
+        return self._random.choice(self._size, batch_size, replace=False)
+
+    def get(self, indices):
+        """
+        :return: (states, actions, rewards, next_states, dones) arrays of the transitions at indices
+        """
+        return (self._states[indices], self._actions[indices], self._rewards[indices],
+                self._next_states[indices], self._dones[indices])
+
+    def sample(self, batch_size):
+        """
+        :return: (states, actions, rewards, next_states, dones) arrays of batch_size random transitions
+        """
+        return self.get(self.sample_indices(batch_size))
+
+    def _allocate(self, state_size):
+        self._states = np.zeros((self._capacity, state_size), dtype=np.float32)
+        self._actions = np.zeros(self._capacity, dtype=np.int32)
+        self._rewards = np.zeros(self._capacity, dtype=np.float32)
+        self._next_states = np.zeros((self._capacity, state_size), dtype=np.float32)
+        self._dones = np.zeros(self._capacity, dtype=bool)
+
+    def importance_weights(self, indices):
+        """
+        Per sample loss weights for the transitions at indices, None when every transition counts the same.
+        """
+        return None
+
+    def update_priorities(self, indices, td_errors):
+        """
+        Tell the memory how far off the predictions for the transitions at indices were.
+        """
+        pass
+
+
+class SumTree:
+    """
+    Binary tree where every node holds the sum of its children, over a fixed number of leaf values.
+
+    Setting leaves and finding the leaf a running sum falls in are both O(log n), and both are vectorized
+    over a batch of leaves/sums.
+    """
+    def __init__(self, capacity):
+        # Leaves sit on one level, so every search takes the same number of steps down
+        self._leaf_offset = 1
+        while self._leaf_offset < capacity:
+            self._leaf_offset *= 2
+        self._capacity = capacity
+
+        # Root at 1, children of i at 2i and 2i+1
+        self._tree = np.zeros(2 * self._leaf_offset, dtype=np.float64)
+
+    def total(self):
+        return self._tree[1]
+
+    def get(self, indices):
+        return self._tree[self._leaf_offset + np.asarray(indices)]
+
+    def set(self, indices, values):
+        nodes = self._leaf_offset + np.asarray(indices)
+        self._tree[nodes] = values
+
+        # Re-add the parents from their children, a level at a time - safe with repeated indices
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self._tree[nodes] = self._tree[2 * nodes] + self._tree[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def find(self, sums):
+        """
+        :param sums: running sums in [0, total)
+        :return: the leaf index each sum falls in
+        """
+        sums = np.array(sums, dtype=np.float64)
+        nodes = np.ones(sums.shape, dtype=np.int64)
+        while nodes[0] < self._leaf_offset:
+            left = 2 * nodes
+            go_right = sums >= self._tree[left]
+            sums -= np.where(go_right, self._tree[left], 0.0)
+            nodes = left + go_right
+
+        # Rounding can walk off the filled leaves at the very end
+        return np.minimum(nodes - self._leaf_offset, self._capacity - 1)
+
+
+class PrioritizedReplayMemory(ReplayMemory):
+    """
+    ReplayMemory that samples transitions in proportion to their last TD error (prioritized experience replay).
+
+    A transition's priority is (|TD error| + PRIORITY_EPSILON) ** alpha, new transitions get the highest priority
+    seen so far so each is trained on at least once. Importance sampling weights, with beta annealed up towards 1,
+    correct the loss for the skewed sampling.
+    """
+    def __init__(self, capacity=MEMORY_SIZE, seed=None, alpha=PRIORITY_ALPHA, alpha_end=None,
+                 beta=PRIORITY_BETA, beta_end=1.0, anneal_steps=ANNEAL_STEPS):
+        """
+        :param alpha: how much the priorities count, 0 is uniform sampling
+        :param alpha_end: alpha after anneal_steps samples, None keeps alpha
+        :param beta: how much the importance sampling weights correct for the priorities, 1 is fully
+        :param beta_end: beta after anneal_steps samples
+        :param anneal_steps: number of sample_indices() calls alpha and beta change linearly over
+        """
+        ReplayMemory.__init__(self, capacity, seed)
+
+        self._alpha_schedule = (alpha, alpha if alpha_end is None else alpha_end)
+        self._beta_schedule = (beta, beta_end)
+        self._anneal_steps = anneal_steps
+        self._samples_taken = 0
+
+        self._priorities = SumTree(capacity)
+        self._max_priority = 1.0  # Before alpha
+
+    def get_alpha(self):
+        return self._scheduled(self._alpha_schedule)
+
+    def get_beta(self):
+        return self._scheduled(self._beta_schedule)
+
+    def add(self, state, action, reward, next_state, done):
+        index = ReplayMemory.add(self, state, action, reward, next_state, done)
+        self._priorities.set([index], self._max_priority ** self.get_alpha())
+        return index
+
+    def sample_indices(self, batch_size):
+        assert batch_size <= self._size, "Cannot sample " + str(batch_size) + " of " + str(self._size) + " transitions."
+        self._samples_taken += 1
+
+        # One sum from each of batch_size equal slices of the total, so a batch is spread over the priorities
+        total = self._priorities.total()
+        sums = (np.arange(batch_size) + self._random.random(batch_size)) * (total / batch_size)
+        return np.minimum(self._priorities.find(sums), self._size - 1)
+
+    def importance_weights(self, indices):
+        probabilities = self._priorities.get(indices) / self._priorities.total()
+        weights = (self._size * probabilities) ** -self.get_beta()
+        return (weights / weights.max()).astype(np.float32)
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.abs(td_errors) + PRIORITY_EPSILON
+        self._max_priority = max(self._max_priority, float(priorities.max()))
+        self._priorities.set(indices, priorities ** self.get_alpha())
+
+    def _scheduled(self, schedule):
+        start, end = schedule
+        fraction = min(self._samples_taken / float(self._anneal_steps), 1.0)
+        return start + fraction * (end - start)
@@ -1,119 +1,72 @@
-import random
-import threading
+import functools
 import time
-from collections import deque
 
-import numpy
 import pygame
 
-from agents import ActionEnum
-from agents.dumb_agent import DumbAgent
 from map.score_board import ScoreBoard
-from sprites import BLUE, RED, GREEN, InvalidMoveException, BLACK, X, Y
-from sprites.tank import Tank
-from map.terrain import Terrain, OutOfMapException
-from sprites.weapons.base_weapon import BaseWeapon
+from simulation import Simulation
+from sprites import InvalidMoveException, BLACK, X, Y
+from map.terrain import OutOfMapException
 
+VIEWER_RENDER_EVERY = 50  # Frames simulated per frame drawn in viewer mode
+VIEWER_SPEED_STEP = 2  # How much '[' and ']' slow down/speed up the viewer
 
-NOMINAL_REWARD = 5
-RENDER_DELTA_T = 25000
-HEADLESS_DELTA_T = 45000
 
+class App(Simulation):
+    """
+    The pygame front end of the Simulation - the window, the scoreboard and the keyboard.
+    """
 
-class App:
-    def __init__(self, render=False, training_mode=False, ml_step_callback=None):
-        self._running = True
-        self._display_surf = None
-        self.size = self.width, self.height = 1024, 512
-
-        self._tank1 = None
-        self._tank2 = None
-
-        self._terrain = None
+    def __init__(self, render=False, training_mode=False, ml_step_callback=None, dirty_rendering=True,
+                 viewer=False, viewer_render_every=VIEWER_RENDER_EVERY, viewer_fps=None, use_landing_table=False):
+        """
+        :param render: draw every frame, with the shots animated
+        :param dirty_rendering: only redraw what moved, see on_render()
+        :param viewer: viewer mode - play exactly like a headless game but draw a sample of the frames (render
+                       should be off). Shots resolve instantly like they do headless, so no projectile is ever
+                       drawn: a shot only shows as the health and turn it changes
+        :param viewer_render_every: viewer mode draws every Nth frame
+        :param viewer_fps: viewer mode draws at this many frames per second instead, None to go by frames
+        :param use_landing_table: see Simulation
+        """
+        Simulation.__init__(self, render=render, training_mode=training_mode, ml_step_callback=ml_step_callback,
+                            use_landing_table=use_landing_table)
 
+        self._display_surf = None
         self._score_board = None
 
-        self._game_over = False
-
-        self._player_1_active = True
-
-        self._player_2 = None
-        self._player_1_guide = None
-
-        self._restart = False
-
-        # Stuff to separtate/allow the ml to train vs user to play
-        self._training_mode = training_mode
-        self._ml_step_callback = ml_step_callback
-        self._ml_next_action = None
-        self._ml_suggested_next_action = None
-        self._step_simulation = False
-        self._action_taken = False
-        self._reward_from_ml_shot = 0
-        self.start_time = time.time()
-
-        self._render_on = render
-
-        self._lock = threading.Lock()
-
-    def on_init(self):
-        pygame.init()
-        self._display_surf = pygame.display.set_mode(self.size, pygame.HWSURFACE | pygame.DOUBLEBUF)
-        self._running = True
-        self._restart = False
-        self._game_over = False
-        self._player_1_active = True
-
-        # Generate terrain
-        self._terrain = Terrain(self.size, color=GREEN)
-
-        # Generate a list of weapons
-        weapons1 = []
-        for i in range(0, 500):
-            weapons1.append(BaseWeapon('BASIC_'+str(i), self.size, self._terrain, BLUE))
-
-        weapons2 = []
-        for i in range(0, 500):
-            weapons2.append(BaseWeapon('BASIC_'+str(i), self.size, self._terrain, RED))
-
-        # Setup two tanks
-        tank1_location_x = random.randint(0, int(self.width/3.0))
-        tank2_location_x = random.randint(int(2*self.width/3.0), self.width - 1)
-        self._tank1 = Tank(screen_dimensions=self.size,
-                           location=[tank1_location_x, self._terrain.height_at_point(tank1_location_x)],
-                           weapons_list=weapons1,
-                           color=BLUE,
-                           terrain=self._terrain,
-                           name="Player 1 (You)",
-                           switch_player_callback=self._switch_player,
-                           damage_callback=self._show_damage
-                           )
-        self._tank2 = Tank(screen_dimensions=self.size,
-                           location=[tank2_location_x, self._terrain.height_at_point(tank2_location_x)],
-                           weapons_list=weapons2,
-                           color=RED,
-                           terrain=self._terrain,
-                           name="Player 2 (CPU)",
-                           switch_player_callback=self._switch_player,
-                           damage_callback=self._show_damage
-                           )
-
-        self._tank1.set_target(self._tank2)
-        self._tank2.set_target(self._tank1)
-
-        self._score_board = ScoreBoard(self.size, self._terrain, self._tank1, self._tank2)
+        # Dirty rect rendering - terrain and scoreboard outline drawn once to a background, then only the tanks,
+        # shots and labels that changed are redrawn and pushed to the screen. Otherwise the whole screen is redrawn
+        # every frame
+        self._dirty_rendering = dirty_rendering
+        self._background = None
+        self._background_game_over = False
+        self._drawn = None  # name: (state, rect) of what is on the screen, see _draw_changed(). None to draw everything
+
+        # Viewer mode
+        self._viewer_on = viewer and not render
+        self._viewer_render_every = viewer_render_every
+        self._viewer_fps = viewer_fps
+        self._frames_since_render = 0
+        self._last_render_time = 0
+
+    def on_init(self, seed=None):
+        # The window and the scoreboard (and its font) are kept for every game after the first
+        if self._display_surf is None:
+            pygame.init()
+            self._display_surf = pygame.display.set_mode(self.size, pygame.HWSURFACE | pygame.DOUBLEBUF)
+
+        Simulation.on_init(self, seed)
+
+        # New terrain
+        self._background = None
+
+        if self._score_board is None:
+            self._score_board = ScoreBoard(self.size, self._terrain, self._tank1, self._tank2)
+        else:
+            self._score_board.reset()
         self._score_board.switch_active_player(self._tank1)
 
-        self._player_2 = DumbAgent()
-        self._player_1_guide = DumbAgent()
-
-        # Init ML stuff
-        self._ml_next_action = None
-        self._ml_suggested_next_action = None
-        self._step_simulation = False
-        self._action_taken = False
-        self._reward_from_ml_shot = 0
-
         return True
 
     def on_event(self, event):
@@ -130,8 +83,25 @@ class App:
 
             elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
                 self._render_on = not self._render_on
+                self._viewer_on = False
+                self._update_fire_mode()
+                self._drawn = None
                 print("Game is now " + "rendering." if self._render_on else "headless.")
 
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_v:
+                # Viewer mode plays headless, so the game goes exactly like it would unwatched
+                self._viewer_on = not self._viewer_on
+                self._render_on = False
+                self._update_fire_mode()
+                self._drawn = None
+                print("Viewer mode is now " + ("on." if self._viewer_on else "off."))
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_RIGHTBRACKET:
+                self._change_viewer_speed(VIEWER_SPEED_STEP)
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_LEFTBRACKET:
+                self._change_viewer_speed(1.0 / VIEWER_SPEED_STEP)
+
             else:
                 if not self._game_over:
 
@@ -190,272 +160,106 @@ class App:
             print('Whoops!')
             print(e)
 
-    def get_game_state(self):
-        """
-           - Tank 1 location x
-           - y
-           - Tank 1 health
-           - Tank 1 Power
-           - Tank 1 Angle
-           - Tank 2 location
-           - y
-           - Tank 2 health
-           - Tank 2 Power
-           - Tank 2 Angle
-        """
-
-        state = [
-            # Tank 1
-            self._tank1.get_location()[X],
-            self._tank1.get_location()[Y],
-            self._tank1.get_health(),
-            self._tank1.get_power(),
-            self._tank1.get_angle(),
-
-            # Tank 2
-            self._tank2.get_location()[X],
-            self._tank2.get_location()[Y],
-            self._tank2.get_health(),
-            self._tank2.get_power(),
-            self._tank2.get_angle(),
-        ]
-
-        self._ml_suggested_next_action = self._player_1_guide.act(state, target_offset=5)
-
-        return state
-
-    # Called before on_loop
-    def _handle_agents(self):
-
-        # Get the current state
-        state = self.get_game_state()
-
-        # if time.time() > self.start_time + 10:
-        #     print("HANLDE AGENTSSSSSSSS")
-        #     print(self._player_1_active)
-        #     print(self._training_mode)
-        #     print( self._step_simulation)
-
-        if not self._player_1_active:
-            if not self._tank2.is_animating():
-                try:
-                    # --------------- #
-                    # Player 2's turn #
-                    # --------------- #
-                    action = self._player_2.act(state)
-                    if action == ActionEnum.LEFT:
-                        # print("Player 2: Moves Left.")
-                        self._tank2.move_left()
-
-                    elif action == ActionEnum.RIGHT:
-                        # print("Player 2: Moves Right.")
-                        self._tank2.move_right()
-
-                    elif action == ActionEnum.INC_PWR:
-                        # print("Player 2: Increases gun power.")
-                        self._tank2.increase_power()
-
-                    elif action == ActionEnum.DEC_PWR:
-                        # print("Player 2: Decreases gun power.")
-                        self._tank2.decrease_power()
-
-                    elif action == ActionEnum.INC_ANG:
-                        # print("Player 2: Increases gun angle.")
-                        self._tank2.increase_angle()
-
-                    elif action == ActionEnum.DEC_ANG:
-                        # print("Player 2: Decreases gun angle.")
-                        self._tank2.decrease_angle()
-
-                    elif action == ActionEnum.FIRE:
-                        # print("Player 2: Fires!")
-                        self._tank2.fire()
-                except InvalidMoveException as e:
-                    print('Whoops! Invalid move: ' + str(e))
-
-        # ML's turn
-        else:
-
-            # If we are in ML playing mode, lets check for its next command
-            if self._training_mode:
-
-                # Marks beginning of a "Step" to the trainer
-                if self._step_simulation:
-                    if not self._tank1.is_animating():
-
-                        try:
-                            # Make sure there are no game commands
-                            if self._ml_next_action == -1:
-                                self._restart = True
-                                self._running = False
-                            elif self._ml_next_action == -2:
-                                self._restart = False
-                                self._running = False
-
-                            # No game commands, check for the next move
-                            else:
-                                # Check for the ML's move
-                                if self._ml_next_action == ActionEnum.LEFT:
-                                    # print("Q-Learning Agent: Moves Left.")
-                                    self._tank1.move_left()
-                                    self._action_taken = True
-                                    self._step_simulation = False
-
-                                elif self._ml_next_action == ActionEnum.RIGHT:
-                                    # print("Q-Learning Agent: Moves Right.")
-                                    self._tank1.move_right()
-                                    self._action_taken = True
-                                    self._step_simulation = False
-
-                                elif self._ml_next_action == ActionEnum.INC_PWR:
-                                    # print("Q-Learning Agent: Increases gun power.")
-                                    self._tank1.increase_power()
-                                    self._action_taken = True
-                                    self._step_simulation = False
-
-                                elif self._ml_next_action == ActionEnum.DEC_PWR:
-                                    # print("Q-Learning Agent: Decreases gun power.")
-                                    self._tank1.decrease_power()
-                                    self._action_taken = True
-                                    self._step_simulation = False
-
-                                elif self._ml_next_action == ActionEnum.INC_ANG:
-                                    # print("Q-Learning Agent: Increases gun angle.")
-                                    self._tank1.increase_angle()
-                                    self._action_taken = True
-                                    self._step_simulation = False
-
-                                elif self._ml_next_action == ActionEnum.DEC_ANG:
-                                    # print("Q-Learning Agent: Decreases gun angle.")
-                                    self._tank1.decrease_angle()
-                                    self._action_taken = True
-                                    self._step_simulation = False
-
-                                elif self._ml_next_action == ActionEnum.FIRE:
-                                    # print("Q-Learning Agent: Fires!")
-                                    self._tank1.fire()
-                                    self._step_simulation = False
-                                    self._action_taken = False  # Tells the action taken callback to not fire beciase an impact callback will fire
-                                else:
-                                    print("Unknown action: " + str(self._ml_next_action))
-
-                        except InvalidMoveException as e:
-                            print('Whoops! Invalid move: ' + str(e))
-                            # Send notification of this to AI
-                            self._handle_action_taken(True)
-
-    def queue_ml_action(self, action):
-        """
-        Send -1 for a restart and a -2 to quit
-
-        :param action:
-        :return:
-        """
-        with self._lock:
-            self._ml_next_action = action
-            self._step_simulation = True
-            self._action_taken = False
-
-    # def step(self):
-    #     self._step_simulation = True
-
     def _show_damage(self, damaged_name, damage_amount):
         self._score_board.damage_display(damaged_name, damage_amount)
 
-    def _calculate_reward(self, damage, distance, is_enemy=False):
-        reward = NOMINAL_REWARD
-
-        # Calculate self damage reward
-        if damage < 0:
-            reward = 0.1
-
-        else:
-            # Damage is either nothing (we missed) or we have some damage, create a reward
-            reward += damage  # Max damage is currently 20 pts
-
-        # Therefore max reward at this point is 100 + 20  (We may need to equalize the width of the screen and damage)
-
-        # Multiply the reward by the inverse of the distance normalized, so the closer we get the more reward we give
-        distance_normalized = float(distance) / float(self.size[X])
-        # print(distance)
-
-        # limit of this calculation is the width of the game screen times the max reward so 1024 * 120
-        if is_enemy:
-            # If its the enemy's shot, we only care if we get hit...give reward for damage
-            reward = - damage
-
-        else:
-            # if its our shot, we want a gradient of damage from target to landing
-            if damage >= 0:
-                # Only add in a distance penalty if we didnt self damage
-                reward *= 1 - distance_normalized
-
-        return reward
-
     def _switch_player(self, impact_location, damage, distance):
-        # Make sure to mark the state of the game before sending a ml step callback reponse
-        if not self._tank1.is_alive() or not self._tank2.is_alive():
-            self._game_over = True
-
-        if not self._player_1_active:
-            # Tell the person who shot, where the impact landed
-            self._player_2.last_impact(impact_location)
-
-            # Our ML Went, then Player 2 went, now lets tell the ML what ended up happening
-            # if self._training_mode:
-            state_now = self.get_game_state()
-            # TODO: For now, we will only let the model train off of its own actions. Since it cant move
-            # reward = self._calculate_reward(damage, distance, is_enemy=True)
-            # reward += self._reward_from_ml_shot
-            reward = self._reward_from_ml_shot
-            if self._render_on:
-                print("REWARD - Fire: " + str(reward))
-            if self._training_mode:
-                # print("Player two fired, handle callback")
-                self._ml_step_callback(state_now, reward, self._game_over)
-            self._reward_from_ml_shot = 0  # Reset this for consistentcy
-        else:
-            # Calculate the reward from ML' sshot
-            self._reward_from_ml_shot = self._calculate_reward(damage, distance)
+        Simulation._switch_player(self, impact_location, damage, distance)
 
-        self._player_1_active = not self._player_1_active
         self._score_board.switch_active_player(self._tank1 if self._player_1_active else self._tank2)
 
-        self._tank1.stop_animating()
-        self._tank2.stop_animating()
-
     # Called after handle agents
     def on_loop(self, elapsed_time):
-        # Update Tank1
-        self._tank1.update(elapsed_time)
-
-        # update tank2
-        self._tank2.update(elapsed_time)
+        Simulation.on_loop(self, elapsed_time)
 
         if self._game_over:
             # send signal to display result
-            self._score_board.end_game(self._tank1 if self._tank1.is_alive() else self._tank2)
+            self._score_board.end_game(self.get_winner())
 
-        # Update Scoreboard
+    def on_render(self):
+        # Catch the scoreboard up, only worth it when drawing
         self._score_board.update()
 
-        # Print out game status - Note this is done again to catch
-        if not self._tank1.is_alive() or not self._tank2.is_alive():
-            self._game_over = True
+        if not self._dirty_rendering:
+            self._render_full()
+            return
 
-    def get_winner(self):
-        return self._tank1 if self._tank1.is_alive() else self._tank2
+        # The static layer only changes with a new game, or when the outline goes at game over
+        if self._background is None or self._background_game_over != self._score_board.is_game_over():
+            self._build_background()
+            self._drawn = None
 
-    def get_loser(self):
-        return self._tank2 if self._tank1.is_alive() else self._tank1
+        full = self._drawn is None
+        if full:
+            self._display_surf.blit(self._background, (0, 0))
+            self._drawn = {}
 
-    def get_player_1(self):
-        return self._tank1
+        rects = self._draw_changed()
 
-    def get_player_2(self):
-        return self._tank2
+        # Push only what was rubbed out or drawn over to the screen
+        if full:
+            pygame.display.update()
+        elif rects:
+            pygame.display.update(rects)
 
-    def on_render(self):
+    def _draw_changed(self):
+        """
+        Rub out what changed or went away since it was last drawn, then draw what changed and whatever overlaps
+        anything rubbed out or drawn, in drawing order.
+
+        :return: the rects rubbed out or drawn over
+        """
+        drawables = self._get_drawables()
+        states = dict((name, state) for name, state, _ in drawables)
+
+        rects = []
+        for name, (state, rect) in list(self._drawn.items()):
+            if name not in states or states[name] != state:
+                self._display_surf.blit(self._background, rect, rect)
+                rects.append(rect)
+                del self._drawn[name]
+
+        for name, state, draw in drawables:
+            drawn = self._drawn.get(name)
+            if drawn is not None and drawn[1].collidelist(rects) == -1:
+                # Unchanged and nothing touched it
+                continue
+
+            rect = draw(self._display_surf)
+            self._drawn[name] = (state, rect)
+            rects.append(rect)
+
+        return rects
+
+    def _get_drawables(self):
+        # (name, state, draw function) of everything on top of the background, in drawing order. Something is
+        # redrawn when its state changes
+        drawables = []
+        for name, tank in (('tank1', self._tank1), ('tank2', self._tank2)):
+            location = tank.get_location()
+            drawables.append((name, (location[X], location[Y], tank.get_angle(), tank.get_health()), tank.draw_body))
+
+            # Only while a shot is in flight
+            shot_location = tank.get_shot_location()
+            if shot_location is not None:
+                drawables.append((name + '_shot', shot_location, tank.draw_shot))
+
+        for name in self._score_board.get_visible_labels():
+            drawables.append((name, self._score_board.get_label_text(name),
+                              functools.partial(self._score_board.draw_label, name=name)))
+
+        return drawables
+
+    def _build_background(self):
+        self._background = pygame.Surface(self.size).convert()
+        self._background.fill(BLACK)
+        self._terrain.draw(self._background)
+
+        self._background_game_over = self._score_board.is_game_over()
+        if not self._background_game_over:
+            self._score_board.draw_outline(self._background)
+
+    def _render_full(self):
         # Reset screen to black
         self._display_surf.fill(BLACK)
 
@@ -476,84 +280,52 @@ class App:
     def show_message(self, message):
         self._score_board.show_message(message)
 
-    def _handle_action_taken(self, no_reward=False):
-        # Generate the state, note that here a NON firing action was taken, so reward will be None(?)
-        reward = NOMINAL_REWARD  # A nominal reward amount
-
-        if self._ml_suggested_next_action != self._ml_next_action:
-            # If the ML deviates from the guide, fail it
-            reward = NOMINAL_REWARD * 0.8
-            # print("reward zero, didnt follow guide")
-            # print("guide action: " + str(self._ml_suggested_next_action))
-
-        if no_reward:
-            # print("NO REWARD")
-            reward = 0
-
-        state_now = self.get_game_state()
-        if self._training_mode:
-            # print("HANDLE ACTION TAKEN")
-            if self._render_on:
-                print("REWARD - Action: " + str(reward))
-            self._ml_step_callback(state_now, reward, self._game_over)
-        self._action_taken = False
-
-    def on_cleanup(self):
-        # pygame.quit()
-        pass
-
-    def on_execute(self):
-        # Allow a game to restart
-        while True:
-            if not self.on_init():
-                self._running = False
-                break
-            else:
-                # successful init
-                self._handle_action_taken()
-
-            # Run the main game loop
-            last_time = pygame.time.get_ticks()
-            time_queue = deque(maxlen=100)
-            count = 0
-            # Seems to be just about the best delta-t for stepping the projectiles in
-            if self._render_on:
-                elapsed_time = RENDER_DELTA_T
-            else:
-                elapsed_time = HEADLESS_DELTA_T
-
-            while self._running:
-                # start_time = time.time()
-
-                with self._lock:
-                    if self._action_taken:
-                        self._handle_action_taken()
-
-                    for event in pygame.event.get():
-                        self.on_event(event)
+    def _frame(self, elapsed_time):
+        if self._action_taken:
+            self._handle_action_taken()
 
-                    self._handle_agents()
+        for event in pygame.event.get():
+            self.on_event(event)
 
-                    self.on_loop(elapsed_time)
+        self._handle_agents()
 
-                    if self._render_on:
-                        self.on_render()
+        self.on_loop(elapsed_time)
 
-                    # end_time = time.time()
-                    # time_queue.append(end_time-start_time)
-                    # if count == 100:
-                    #     count = 0
-                    #     print("AVG: " + str(1000 * (numpy.sum(time_queue)/len(time_queue))))
+        if self._render_on or self._viewer_frame_due():
+            self.on_render()
 
-                    count += 1
+    def _viewer_frame_due(self):
+        # Viewer mode draws a sample of the frames, every Nth one or at the target frame rate
+        if not self._viewer_on:
+            return False
 
-                time.sleep(0.0001)  # Allow for some unlocked time
+        self._frames_since_render += 1
+        if self._viewer_fps is not None:
+            due = time.time() - self._last_render_time >= 1.0 / self._viewer_fps
+        else:
+            due = self._frames_since_render >= self._viewer_render_every
+
+        if due:
+            self._frames_since_render = 0
+            self._last_render_time = time.time()
+        return due
+
+    def _change_viewer_speed(self, factor):
+        # Faster means drawing less often
+        if self._viewer_fps is not None:
+            self._viewer_fps = max(self._viewer_fps / factor, 1.0)
+            print("Viewer drawing " + str(self._viewer_fps) + " frames per second.")
+        else:
+            self._viewer_render_every = max(int(round(self._viewer_render_every * factor)), 1)
+            print("Viewer drawing every " + str(self._viewer_render_every) + " frames.")
 
-            self.on_cleanup()
+    def on_execute(self):
+        Simulation.on_execute(self)
+        self.close()
 
-            if not self._restart:
-                pygame.quit()
-                break
+    def close(self):
+        pygame.quit()
+        self._display_surf = None
 
 
 if __name__ == "__main__":
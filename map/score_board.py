@@ -1,9 +1,12 @@
+from collections import OrderedDict
+
 from pygame.sprite import Sprite
 import pygame
 from sprites import X, Y, RED, GREEN, BLUE
 
 HEIGHT = 130
 POPUP_COUNTDOWN = 1000
+TEXT_CACHE_SIZE = 128  # Rendered text surfaces kept around, labels cycle through a small set of values
 
 
 class ScoreBoard(Sprite):
@@ -24,54 +27,45 @@ class ScoreBoard(Sprite):
         self._scoreboard_outline = []
         self._ = []
 
-        # Scoreboard text
-        self._weapon_1_label = self._font.render('Weapon Type: ', False, RED)
-        self._weapon_1_label_location = [2, 0]
-        self._weapon_2_label = self._font.render('Weapon Type: ', False, RED)
-        self._weapon_2_label_location = [self._dimensions[X]-200, 0]
-
-        self._tank1_health = self._font.render('Tank 1 Health: ', False, BLUE)
-        self._tank1_health_location = [2, 0]
-        self._tank1_health_location[Y] = self._weapon_1_label_location[Y] + 20
-        self._tank2_health = self._font.render('Tank 2 Health: ', False, RED)
-        self._tank2_health_location = [self._weapon_2_label_location[X], 0]
-        self._tank2_health_location[Y] = self._weapon_2_label_location[Y] + 20
-
-        self._tank1_power = self._font.render('Tank power: ', False, BLUE)
-        self._tank1_power_location = [2, 0]
-        self._tank1_power_location[Y] = self._weapon_1_label_location[Y] + 40
-
-        self._tank1_angle = self._font.render('Tank angle: ', False, BLUE)
-        self._tank1_angle_location = [2, 0]
-        self._tank1_angle_location[Y] = self._weapon_1_label_location[Y] + 60
-
-        self._tank1_moves = self._font.render('Moves', False, BLUE)
-        self._tank1_moves_location = [2, 0]
-        self._tank1_moves_location[Y] = self._weapon_2_label_location[Y] + 80
-
-        self._tank2_power = self._font.render('Tank power: ', False, BLUE)
-        self._tank2_power_location = [self._dimensions[X]-200, 0]
-        self._tank2_power_location[Y] = self._weapon_2_label_location[Y] + 40
-
-        self._tank2_angle = self._font.render('Tank angle: ', False, BLUE)
-        self._tank2_angle_location = [self._dimensions[X]-200, 0]
-        self._tank2_angle_location[Y] = self._weapon_2_label_location[Y] + 60
-
-        self._tank2_moves = self._font.render('Moves', False, BLUE)
-        self._tank2_moves_location = [self._dimensions[X]-200, 0]
-        self._tank2_moves_location[Y] = self._weapon_2_label_location[Y] + 80
+        # Scoreboard text - labels are (text, color) till they are drawn, see _get_label()
+        self._labels = {}
+        self._rendered_labels = {}  # name: ((text, color), surface) of what was last drawn
+        self._text_cache = OrderedDict()  # (text, color): surface, least recently used first
+
+        self._label_locations = {}
+        self._label_locations['weapon_1'] = [2, 0]
+        self._label_locations['weapon_2'] = [self._dimensions[X]-200, 0]
+        self._label_locations['tank1_health'] = [2, 20]
+        self._label_locations['tank2_health'] = [self._dimensions[X]-200, 20]
+        self._label_locations['tank1_power'] = [2, 40]
+        self._label_locations['tank1_angle'] = [2, 60]
+        self._label_locations['tank1_moves'] = [2, 80]
+        self._label_locations['tank2_power'] = [self._dimensions[X]-200, 40]
+        self._label_locations['tank2_angle'] = [self._dimensions[X]-200, 60]
+        self._label_locations['tank2_moves'] = [self._dimensions[X]-200, 80]
+
+        self._set_label('weapon_1', 'Weapon Type: ', RED)
+        self._set_label('weapon_2', 'Weapon Type: ', RED)
+        self._set_label('tank1_health', 'Tank 1 Health: ', BLUE)
+        self._set_label('tank2_health', 'Tank 2 Health: ', RED)
+        self._set_label('tank1_power', 'Tank power: ', BLUE)
+        self._set_label('tank1_angle', 'Tank angle: ', BLUE)
+        self._set_label('tank1_moves', 'Moves', BLUE)
+        self._set_label('tank2_power', 'Tank power: ', BLUE)
+        self._set_label('tank2_angle', 'Tank angle: ', BLUE)
+        self._set_label('tank2_moves', 'Moves', BLUE)
 
         # Game over text
-        self._game_over_label = self._font.render('Game over', False, RED)
-        self._game_over_location = [self._dimensions[X]/2 - 150, self._dimensions[Y]/2]
+        self._set_label('game_over', 'Game over', RED)
+        self._label_locations['game_over'] = [self._dimensions[X]/2 - 150, self._dimensions[Y]/2]
 
         # Active player text
-        self._active_player_label = self._font.render('Active player', False, RED)
-        self._active_player_label_location = [self._dimensions[X]/2 - 150, self._dimensions[Y]/2]
+        self._set_label('active_player', 'Active player', RED)
+        self._label_locations['active_player'] = [self._dimensions[X]/2 - 150, self._dimensions[Y]/2]
 
         # Damage text
-        self._damage_label = self._font.render('Damage', False, RED)
-        self._damage_label_location = [self._dimensions[X]/2 - 150, 0]
+        self._set_label('damage', 'Damage', RED)
+        self._label_locations['damage'] = [self._dimensions[X]/2 - 150, 0]
 
         # Init the polygons and locations
         self._init_scoreboard()
@@ -83,87 +77,161 @@ class ScoreBoard(Sprite):
 
         # Message to show
         self._ext_message = None
-        self._ext_message_label = self._font.render('', False, BLUE)
-        self._ext_message_label_location = [0, self._dimensions[Y] - 50]
+        self._set_label('ext_message', '', BLUE)
+        self._label_locations['ext_message'] = [0, self._dimensions[Y] - 50]
+
+    def reset(self):
+        # New game, same tanks and terrain
+        self._game_over = False
+        self._active_player_countdown = 0
+        self._damage_countdown = 0
 
     def update(self):
-        self._weapon_1_label = self._font.render('Weapon: ' + self._tank1.get_current_weapon_name() + " (< or >)", False, self._tank1.get_color())
-        self._weapon_2_label = self._font.render('Weapon: ' + self._tank2.get_current_weapon_name(), False, self._tank2.get_color())
+        """
+        Catch the labels up with the tanks. Only needed before a draw, text is only rendered for labels that changed.
+        """
+        self._set_label('weapon_1', 'Weapon: ' + self._tank1.get_current_weapon_name() + " (< or >)", self._tank1.get_color())
+        self._set_label('weapon_2', 'Weapon: ' + self._tank2.get_current_weapon_name(), self._tank2.get_color())
 
-        self._tank1_health = self._font.render('Health: ' + str(self._tank1.get_health()), False, self._tank1.get_color())
-        self._tank2_health = self._font.render('Health: ' + str(self._tank2.get_health()), False, self._tank2.get_color())
+        self._set_label('tank1_health', 'Health: ' + str(self._tank1.get_health()), self._tank1.get_color())
+        self._set_label('tank2_health', 'Health: ' + str(self._tank2.get_health()), self._tank2.get_color())
 
         # Display tank 1 data
-        self._tank1_power = self._font.render('Power: ' + str(self._tank1.get_power()) + " (- or +)", False, self._tank1.get_color())
-        self._tank1_angle = self._font.render('Angle: ' + str(self._tank1.get_angle()) + " (down or up)", False, self._tank1.get_color())
-        self._tank1_moves = self._font.render('Moves: ' + str(self._tank1.get_move_count()) + " (left or right)", False, self._tank1.get_color())
+        self._set_label('tank1_power', 'Power: ' + str(self._tank1.get_power()) + " (- or +)", self._tank1.get_color())
+        self._set_label('tank1_angle', 'Angle: ' + str(self._tank1.get_angle()) + " (down or up)", self._tank1.get_color())
+        self._set_label('tank1_moves', 'Moves: ' + str(self._tank1.get_move_count()) + " (left or right)", self._tank1.get_color())
 
         # Display tank 2 data
-        self._tank2_power = self._font.render('Power: ' + str(self._tank2.get_power()), False, self._tank2.get_color())
-        self._tank2_angle = self._font.render('Angle: ' + str(self._tank2.get_angle()), False, self._tank2.get_color())
-        self._tank2_moves = self._font.render('Moves: ' + str(self._tank2.get_move_count()), False, self._tank2.get_color())
+        self._set_label('tank2_power', 'Power: ' + str(self._tank2.get_power()), self._tank2.get_color())
+        self._set_label('tank2_angle', 'Angle: ' + str(self._tank2.get_angle()), self._tank2.get_color())
+        self._set_label('tank2_moves', 'Moves: ' + str(self._tank2.get_move_count()), self._tank2.get_color())
 
         # Show a message
         if self._ext_message != "":
-            self._ext_message_label = self._font.render(self._ext_message, False, BLUE)
+            self._set_label('ext_message', self._ext_message or '', BLUE)
 
     def end_game(self, winner_tank):
         self._game_over = True
-        self._game_over_label = self._font.render('Game over: ' + winner_tank.get_name() + " wins.", False, winner_tank.get_color())
+        self._set_label('game_over', 'Game over: ' + winner_tank.get_name() + " wins.", winner_tank.get_color())
 
     def damage_display(self, name, damage_amount):
-        self._damage_label = self._font.render(name + ' damaged ' + str(damage_amount) + "!", False, RED)
+        self._set_label('damage', name + ' damaged ' + str(damage_amount) + "!", RED)
         self._damage_countdown = POPUP_COUNTDOWN
 
     def switch_active_player(self, active_tank):
-        self._active_player_label = self._font.render(active_tank.get_name() + "'s turn.", False, active_tank.get_color())
+        self._set_label('active_player', active_tank.get_name() + "'s turn.", active_tank.get_color())
         self._active_player_countdown = POPUP_COUNTDOWN
 
     def show_message(self, message):
         self._ext_message = message
 
     def draw(self, surface):
+        """
+        :return: the rects drawn over
+        """
+        rects = []
+        if not self._game_over:
+            rects.append(self.draw_outline(surface))
+        return rects + self.draw_labels(surface)
+
+    def draw_outline(self, surface):
+        # Draw the outline
+        return pygame.draw.polygon(
+            surface,
+            GREEN,
+            self._scoreboard_outline,
+            2
+        )
+
+    def is_game_over(self):
+        return self._game_over
+
+    def draw_labels(self, surface):
+        """
+        Draw the text, without the outline.
+
+        :return: the rects drawn over
+        """
+        return [self.draw_label(surface, name) for name in self.get_visible_labels()]
+
+    def get_visible_labels(self):
+        """
+        The labels to draw this frame, in drawing order. The popups count down with every call, so call it once per
+        frame drawn.
+        """
         # Draw game over if over
         if self._game_over:
-            surface.blit(self._game_over_label, self._game_over_location)
-        else:
-            # Draw the outline
-            pygame.draw.polygon(
-                surface,
-                GREEN,
-                self._scoreboard_outline,
-                2
-            )
-
-            # Draw weapon choice
-            surface.blit(self._weapon_1_label, self._weapon_1_label_location)
-            surface.blit(self._weapon_2_label, self._weapon_2_label_location)
-
-            # Draw health
-            surface.blit(self._tank1_health, self._tank1_health_location)
-            surface.blit(self._tank2_health, self._tank2_health_location)
-
-            # Draw gun data
-            surface.blit(self._tank1_power, self._tank1_power_location)
-            surface.blit(self._tank1_angle, self._tank1_angle_location)
-            surface.blit(self._tank1_moves, self._tank1_moves_location)
-
-            surface.blit(self._tank2_power, self._tank2_power_location)
-            surface.blit(self._tank2_angle, self._tank2_angle_location)
-            surface.blit(self._tank2_moves, self._tank2_moves_location)
-
-            # Show message
-            surface.blit(self._ext_message_label, self._ext_message_label_location)
-
-            # Display damage count down
-            if self._damage_countdown > 0:
-                surface.blit(self._damage_label, self._damage_label_location)
-                self._damage_countdown -= 1
-
-            # Display new active player text
-            if self._active_player_countdown > 0:
-                surface.blit(self._active_player_label, self._active_player_label_location)
-                self._active_player_countdown -= 1
+            return ['game_over']
+
+        names = [
+            # Weapon choice
+            'weapon_1',
+            'weapon_2',
+
+            # Health
+            'tank1_health',
+            'tank2_health',
+
+            # Gun data
+            'tank1_power',
+            'tank1_angle',
+            'tank1_moves',
+
+            'tank2_power',
+            'tank2_angle',
+            'tank2_moves',
+
+            # Message
+            'ext_message',
+        ]
+
+        # Display damage count down
+        if self._damage_countdown > 0:
+            names.append('damage')
+            self._damage_countdown -= 1
+
+        # Display new active player text
+        if self._active_player_countdown > 0:
+            names.append('active_player')
+            self._active_player_countdown -= 1
+
+        return names
+
+    def get_label_text(self, name):
+        """
+        :return: (text, color) the label shows
+        """
+        return self._labels[name]
+
+    def draw_label(self, surface, name):
+        """
+        :return: the rect drawn over
+        """
+        return surface.blit(self._get_label(name), self._label_locations[name])
+
+    def _set_label(self, name, text, color):
+        self._labels[name] = (text, color)
+
+    def _get_label(self, name):
+        # Re-render a label only when its text or color changed since it was last drawn
+        key = self._labels[name]
+        rendered = self._rendered_labels.get(name)
+        if rendered is None or rendered[0] != key:
+            rendered = (key, self._render_text(*key))
+            self._rendered_labels[name] = rendered
+        return rendered[1]
+
+    def _render_text(self, text, color):
+        key = (text, tuple(color))
+        if key in self._text_cache:
+            self._text_cache.move_to_end(key)
+            return self._text_cache[key]
+
+        text_surface = self._font.render(text, False, color)
+        self._text_cache[key] = text_surface
+        if len(self._text_cache) > TEXT_CACHE_SIZE:
+            self._text_cache.popitem(last=False)
+        return text_surface
 
     def _init_scoreboard(self):
 
@@ -1,11 +1,10 @@
-import bisect
 import math
 from math import atan2
 
+import numpy as np
 import pygame
 
 from sprites import X, Y
-import random
 
 
 MAX_TERRAIN = 200
@@ -17,24 +16,59 @@ class OutOfMapException(Exception):
     pass
 
 
+def generate_heightfield(dimension, seed=None):
+    """
+    Generate the terrain heights for a map, one per x (the right edge included), without building a Terrain.
+
+    :param dimension: map size [x, y]
+    :param seed: seed for the random displacements, None for a random terrain
+    :return: int32 array of the surface's y value for each x
+    """
+    heights = Terrain._midpoint_displacement(start_height=dimension[Y] - MAX_TERRAIN,
+                                             end_height=dimension[Y] - MAX_TERRAIN,
+                                             roughness=0.9,
+                                             vertical_displacement=dimension[Y] - MAX_TERRAIN,
+                                             num_of_iterations=13,
+                                             num_of_points=dimension[X] + 1,
+                                             rng=np.random.default_rng(seed))
+
+    heights[heights >= dimension[Y]] = dimension[Y] - 1
+    return np.ascontiguousarray(heights, dtype=np.int32)
+
+
 class Terrain:
-    def __init__(self, dimension, color):
+    def __init__(self, dimension, color, seed=None):
 
         # Game details
         self._dimension = dimension
 
-        # Terrain Generation
-        self._terrain = []
+        # Terrain Generation - heightfield, the surface's y value for each x
+        self._terrain = np.zeros(0, dtype=np.int32)
         self._color = color
         self._terrain_polygon = []
+        self._grade_tables = {}  # width: grade_at_point() of every x on the map, see _build_grade_table()
+        self._highest = []  # Sparse table, level k holds the min y (the highest surface) of the 2^k columns from x
 
         # Generate terrain
-        self.generate_terrain()
+        self.generate_terrain(seed)
+
+    def get_heights(self):
+        return self._terrain
 
     def height_at_point(self, pt):
-        return self._terrain[pt]
+        return int(self._terrain[pt])
 
     def grade_at_point(self, pt, width=4):
+        # Look it up, the table for a width is built the first time it is asked for and on every terrain change
+        table = self._grade_tables.get(width)
+        if table is None:
+            table = self._grade_tables[width] = self._build_grade_table(width)
+
+        if isinstance(pt, (int, np.integer)) and 0 <= pt < len(table):
+            return table[pt]
+        return self._grade_at_point(pt, width)
+
+    def _grade_at_point(self, pt, width=4):
         # TODO: Do smart things with small tall peaks, use some physics maybe??
 
         # dist either side
@@ -45,35 +79,114 @@ class Terrain:
         high_x = pt + dist if pt + dist < self._dimension[X] else self._dimension[X] - 1
 
         # Get the y value for point left and right of middle point
-        h_less = self._terrain[less_x]
-        h_high = self._terrain[high_x]
+        h_less = int(self._terrain[less_x])
+        h_high = int(self._terrain[high_x])
 
         # Calculate and return slope - What a bitch
         slope = - (360 + ((atan2((h_less - h_high), (less_x - high_x)) * 180.0 / math.pi) - 180))
         return slope
 
-    def generate_terrain(self):
+    def _build_grade_table(self, width):
+        """
+        _grade_at_point() for every x of the heightfield.
+
+        Only the (rise, run) pairs that actually occur go through atan2, with the same math as _grade_at_point(),
+        so the table holds the exact same values.
+
+        :return: list of the grade at each x
+        """
+        dist = int(width/2.0)
+        xs = np.arange(len(self._terrain))
+        less_x = np.maximum(xs - dist, 0)
+        high_x = np.where(xs + dist < self._dimension[X], xs + dist, self._dimension[X] - 1)
+
+        pairs = np.stack([self._terrain[less_x].astype(np.int64) - self._terrain[high_x], less_x - high_x], axis=1)
+        unique_pairs, inverse = np.unique(pairs, axis=0, return_inverse=True)
+
+        slopes = [- (360 + ((atan2(rise, run) * 180.0 / math.pi) - 180)) for rise, run in unique_pairs.tolist()]
+        return [slopes[i] for i in inverse.reshape(-1).tolist()]
+
+    def generate_terrain(self, seed=None):
         # previous_height = random.randint(self._dimension[Y] - MAX_TERRAIN, self._dimension[Y] - 1)
         # for x in range(0, self._dimension[X]):
         #     self._terrain.append(self._random_height(previous_height))  # Generate and save current height
         #     previous_height = self._terrain[x]  # Save off for previous in next iteration
 
-        points = self._midpoint_displacement(start=[0, self._dimension[Y] - MAX_TERRAIN],
-                                             end=[self._dimension[X]+1, self._dimension[Y] - MAX_TERRAIN],
-                                             roughness=0.9,
-                                             vertical_displacement=self._dimension[Y] - MAX_TERRAIN,
-                                             num_of_iterations=13)
+        self._terrain = generate_heightfield(self._dimension, seed)
+
+        self._build_highest_table()
 
-        for point in points:
-            self._terrain.append(point[1] if point[1] < self._dimension[Y] else self._dimension[Y] - 1)
+        # Grades for the widths in use, for the new terrain
+        for width in self._grade_tables:
+            self._grade_tables[width] = self._build_grade_table(width)
 
         # Generate the polygon for this terrain list
+        self._terrain_polygon = []
         self._terrain_polygon.append([0, self._dimension[Y]])  # Bottom left corner of the screen
-        for x, y in enumerate(self._terrain):
+        for x, y in enumerate(self._terrain.tolist()):
             self._terrain_polygon.append([x, y])  # points along the terrain
         self._terrain_polygon.append([self._dimension[X], self._dimension[Y]])  # Bottom Right
         self._terrain_polygon.append([0, self._dimension[Y]])  # Bottom left corner of the screen again to close polygon
 
+    def highest_point(self, a, b):
+        """
+        The highest the surface gets between two columns, in O(1).
+
+        :param a: first column
+        :param b: last column (included), a <= b
+        :return: the smallest y value of the heightfield in [a, b]
+        """
+        level = (b - a + 1).bit_length() - 1
+        heights = self._highest[level]
+        return min(heights[a], heights[b - (1 << level) + 1])
+
+    def first_contact(self, a, b, origin, slope, curvature, pad=0, margin=0):
+        """
+        Walk the columns from a to b (either direction) and find the first one where a parabola is not clear of the
+        surface. Spans that are clear as a whole are skipped, doubling the span size after each clear one and halving
+        it when one is not, so a query takes about log(columns) span checks for each stretch of clear terrain.
+
+        The parabola is y(x) = origin y + slope * (x - origin x) + curvature * (x - origin x)^2. A span of columns is
+        clear when the highest the parabola gets over it is above the highest surface in it by more than margin.
+
+        :param a: first column, clipped to the map
+        :param b: last column, clipped to the map
+        :param origin: [x, y] the parabola is written about
+        :param pad: also count the parabola this far past each end of a span
+        :param margin: how far above the surface the parabola has to stay
+        :return: the first column that is not clear, None if they all are
+        """
+        step = 1 if b >= a else -1
+        a = min(max(a, 0), len(self._terrain) - 1)
+        b = min(max(b, 0), len(self._terrain) - 1)
+        if (b - a) * step < 0:
+            return None
+
+        def lowest(lo, hi):
+            # The parabola's largest y over [lo, hi], at an end or at the vertex
+            ys = [origin[Y] + slope * (x - origin[X]) + curvature * (x - origin[X])**2 for x in (lo, hi)]
+            if curvature < 0:
+                vertex = origin[X] - slope / (2 * curvature)
+                if lo < vertex < hi:
+                    ys.append(origin[Y] + slope * (vertex - origin[X]) + curvature * (vertex - origin[X])**2)
+            return max(ys)
+
+        x = a
+        size = 1
+        while (b - x) * step >= 0:
+            end = x + step * min(size - 1, (b - x) * step)
+            lo, hi = min(x, end), max(x, end)
+            if lowest(lo - pad, hi + pad) + margin < self.highest_point(lo, hi):
+                # Clear, move past it and try a bigger span
+                x = end + step
+                size *= 2
+            elif lo == hi:
+                return x
+            else:
+                size = max(size // 2, 1)
+
+        return None
+
     def intersects_terrain(self, location, buffer_x=0, buffer_y=0):
         # TODO Add a buffer to calculation to make it easier
         if location[X] > self._dimension[X]:
@@ -89,7 +202,7 @@ class Terrain:
         # print(location)
 
         # We made it here, the thing is still in the map
-        if self._terrain[location[X]] <= location[Y]:
+        if int(self._terrain[location[X]]) <= location[Y]:
             # print("INTERSECT WITH GROUND: " + str(self._terrain[location[X]]) + " " + str(location[Y]))
             # Terrain is over or equal to height of projectile at this X location, we intersect
             return True
@@ -97,8 +210,28 @@ class Terrain:
             # Otherwise we do not intersect
             return False
 
+    def in_map(self, xs):
+        """
+        Vectorized map bounds check, the same bounds intersects_terrain() raises OutOfMapException for.
+
+        :param xs: array of x values
+        :return: boolean array, True where the x value is inside of the map
+        """
+        xs = np.asarray(xs)
+        return (xs >= 0) & (xs <= self._dimension[X])
+
+    def _build_highest_table(self):
+        # Level k from level k - 1: the min of two neighboring spans of 2^(k - 1) columns
+        level = self._terrain
+        self._highest = [level.tolist()]
+        span = 1
+        while 2 * span <= len(self._terrain):
+            level = np.minimum(level[:-span], level[span:])
+            self._highest.append(level.tolist())
+            span *= 2
+
     def draw(self, surface):
-        pygame.draw.polygon(
+        return pygame.draw.polygon(
             surface,
             self._color,
             self._terrain_polygon,
@@ -114,57 +247,54 @@ class Terrain:
     #         return random.randint(previous_height, self._dimension[Y] - 1)
 
     # Iterative midpoint vertical displacement
-    def _midpoint_displacement(self, start, end, roughness, vertical_displacement=None,
-                               num_of_iterations=16):
+    @staticmethod
+    def _midpoint_displacement(start_height, end_height, roughness, vertical_displacement=None,
+                               num_of_iterations=16, num_of_points=None, rng=None):
         """
-        Given a straight line segment specified by a starting point and an endpoint
-        in the form of [starting_point_x, starting_point_y] and [endpoint_x, endpoint_y],
-        a roughness value > 0, an initial vertical displacement and a number of
-        iterations > 0 applies the  midpoint algorithm to the specified segment and
-        returns the obtained list of points in the form
-        points = [[x_0, y_0],[x_1, y_1],...,[x_n, y_n]]
+        Given the heights at the start and end of a straight line segment, a roughness
+        value > 0, an initial vertical displacement and a number of iterations > 0
+        applies the midpoint algorithm to the segment and returns an array with the
+        first num_of_points heights of the (2^iterations)+1 point profile.
+
+        Only the leftmost part of the profile that is returned is ever computed: the
+        coarse iterations just follow the right end point of the leftmost segment, then
+        the remaining iterations displace all midpoints of a level at once.
 
         From:
         https://bitesofcode.wordpress.com/2016/12/23/landscape-generation-using-midpoint-displacement/
 
         """
-        # Final number of points = (2^iterations)+1
         if vertical_displacement is None:
             # if no initial displacement is specified set displacement to:
             #  (y_start+y_end)/2
-            vertical_displacement = (start[1] + end[1]) / 2
-        # Data structure that stores the points is a list of lists where
-        # each sublist represents a point and holds its x and y coordinates:
-        # points=[[x_0, y_0],[x_1, y_1],...,[x_n, y_n]]
-        #              |          |              |
-        #           point 0    point 1        point n
-        # The points list is always kept sorted from smallest to biggest x-value
-        points = [start, end]
-        iteration = 1
-        while iteration <= num_of_iterations:
-            # Since the list of points will be dynamically updated with the new computed
-            # points after each midpoint displacement it is necessary to create a copy
-            # of the state at the beginning of the iteration so we can iterate over
-            # the original sequence.
-            # Tuple type is used for security reasons since they are immutable in Python.
-            points_tup = tuple(points)
-            for i in range(len(points_tup) - 1):
-                # Calculate x and y midpoint coordinates:
-                # [(x_i+x_(i+1))/2, (y_i+y_(i+1))/2]
-                midpoint = list(map(lambda x: (points_tup[i][x] + points_tup[i + 1][x]) / 2,
-                                    [0, 1]))
-                # Displace midpoint y-coordinate
-                midpoint[1] += random.choice([-vertical_displacement,
-                                              vertical_displacement])
-                # Insert the displaced midpoint in the current list of points
-                bisect.insort(points, midpoint)
-                # bisect allows to insert an element in a list so that its order
-                # is preserved.
-                # By default the maintained order is from smallest to biggest list first
-                # element which is what we want.
+            vertical_displacement = (start_height + end_height) / 2
+        if num_of_points is None:
+            num_of_points = 2 ** num_of_iterations + 1
+        if rng is None:
+            rng = np.random.default_rng()
+
+        # Iterations needed to split one segment into at least num_of_points points, the rest are coarse iterations
+        fine_iterations = int(math.ceil(math.log2(max(num_of_points - 1, 1))))
+        coarse_iterations = max(num_of_iterations - fine_iterations, 0)
+
+        # Coarse iterations, each one halves the leftmost segment - only its right end point is left to displace
+        end_height = float(end_height)
+        for _ in range(coarse_iterations):
+            end_height = (start_height + end_height) / 2 + rng.choice([-vertical_displacement, vertical_displacement])
+            vertical_displacement *= 2 ** (-roughness)
+
+        # Fine iterations, level by level. Each level displaces the midpoints between the points 'step' apart
+        heights = np.empty(2 ** fine_iterations + 1)
+        heights[0] = start_height
+        heights[-1] = end_height
+        step = 2 ** fine_iterations
+        while step > 1:
+            half = step // 2
+            midpoints = (heights[0:-1:step] + heights[step::step]) / 2
+            heights[half::step] = midpoints + rng.choice([-vertical_displacement, vertical_displacement],
+                                                         size=midpoints.size)
             # Reduce displacement range
             vertical_displacement *= 2 ** (-roughness)
-            # update number of iterations
-            iteration += 1
+            step = half
 
-        return points
+        return heights[:num_of_points]
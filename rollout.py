@@ -0,0 +1,149 @@
+import multiprocessing
+import queue
+import random
+
+import numpy as np
+
+from simulation import Simulation
+
+CHUNK_SIZE = 64  # Steps a worker collects before sending them to the learner
+POLL_TIMEOUT = 1.0  # Seconds the learner waits on the workers before checking that they are still alive
+
+
+def _rollout_worker(worker_id, seed, agent_factory, state_size, transitions, weights, stop, chunk_size, action_table):
+    """
+    Worker process: plays headless games with its own copy of the agent, forever, sending every step back.
+
+    Messages put on the transitions queue are (worker id, list of (state, action, reward, next_state, done),
+    game summary or None while the game is still going).
+    """
+    agent = agent_factory()
+    game = Simulation(training_mode=True)
+    seeds = random.Random(seed)
+
+    while not stop.is_set():
+        # Pick up the newest weights from the learner, skip any older ones
+        update = None
+        try:
+            while True:
+                update = weights.get_nowait()
+        except queue.Empty:
+            pass
+
+        if update is not None:
+            model_weights, epsilon = update
+            agent.set_weights(model_weights)
+            agent.set_epsilon(epsilon)
+
+        # Play a game
+        steps = []
+        state = np.reshape(game.reset(seeds.getrandbits(32)), [1, state_size])
+        game_over = False
+        while not game_over:
+            action = agent.act(state)
+            next_state, reward, game_over, _ = game.step(action if action_table is None else action_table[action])
+            next_state = np.reshape(next_state, [1, state_size])
+            steps.append((state, action, reward, next_state, game_over))
+            state = next_state
+
+            if len(steps) >= chunk_size and not game_over:
+                transitions.put((worker_id, steps, None))
+                steps = []
+
+        transitions.put((worker_id, steps, game.get_game_summary()))
+
+
+class RolloutWorkers:
+    """
+    K worker processes, each playing its own headless game with a copy of the learner's agent.
+
+    The learner takes their steps in through next_episode() and sends its latest weights back out with
+    sync_weights(). Every worker plays its own seeded games and a worker that dies is restarted with a new seed.
+    """
+    def __init__(self, num_workers, agent_factory, state_size, seed=None, chunk_size=CHUNK_SIZE, action_table=None):
+        """
+        :param num_workers: number of worker processes
+        :param agent_factory: picklable callable building the agent a worker acts with,
+                              e.g. functools.partial(DqnAgent, state_size, action_size)
+        :param state_size: size of a game state
+        :param seed: seed for the workers' seeds, None for random games
+        :param chunk_size: steps a worker collects before sending them
+        :param action_table: what the agent's action indexes stand for (e.g. MACRO_ACTIONS), None for ActionEnum values
+        """
+        # Spawn, so workers never inherit the learner's model/framework state
+        self._context = multiprocessing.get_context('spawn')
+
+        self._num_workers = num_workers
+        self._agent_factory = agent_factory
+        self._state_size = state_size
+        self._chunk_size = chunk_size
+        self._action_table = action_table
+        self._seeds = random.Random(seed)
+
+        self._transitions = self._context.Queue()
+        self._stop = self._context.Event()
+        self._workers = [None] * num_workers
+        self._weights = [None] * num_workers
+        self._latest_weights = None
+
+    def start(self):
+        for worker_id in range(self._num_workers):
+            self._start_worker(worker_id)
+
+    def stop(self):
+        self._stop.set()
+        for worker in self._workers:
+            worker.join(timeout=POLL_TIMEOUT)
+            if worker.is_alive():
+                worker.terminate()
+
+    def sync_weights(self, agent):
+        """
+        Send the agent's current weights and epsilon to every worker.
+        """
+        self._latest_weights = (agent.get_weights(), agent.get_epsilon())
+        for weights in self._weights:
+            weights.put(self._latest_weights)
+
+    def next_episode(self, agent):
+        """
+        Remember the workers' steps in the agent until one of the workers finishes a game.
+
+        :return: the finished game's summary
+        """
+        while True:
+            self._restart_dead_workers()
+
+            try:
+                worker_id, steps, summary = self._transitions.get(timeout=POLL_TIMEOUT)
+            except queue.Empty:
+                continue
+
+            for state, action, reward, next_state, done in steps:
+                agent.remember(state, action, reward, next_state, done)
+
+            if summary is not None:
+                return summary
+
+    def _start_worker(self, worker_id):
+        # Fresh queue, so a restarted worker does not read a dead worker's leftovers, and the latest weights
+        self._weights[worker_id] = self._context.Queue()
+        if self._latest_weights is not None:
+            self._weights[worker_id].put(self._latest_weights)
+
+        worker = self._context.Process(
+            target=_rollout_worker,
+            args=(worker_id, self._seeds.getrandbits(32), self._agent_factory, self._state_size,
+                  self._transitions, self._weights[worker_id], self._stop, self._chunk_size,
+                  self._action_table),
+            daemon=True
+        )
+        worker.start()
+        self._workers[worker_id] = worker
+
+    def _restart_dead_workers(self):
+        for worker_id, worker in enumerate(self._workers):
+            if not worker.is_alive() and not self._stop.is_set():
+                print("Rollout worker " + str(worker_id) + " died (exit code " + str(worker.exitcode) +
+                      "), restarting it.")
+                self._start_worker(worker_id)
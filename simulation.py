@@ -0,0 +1,583 @@
+import random
+import threading
+import time
+
+import numpy as np
+
+from agents import ActionEnum, MacroAction, StateEnum
+from agents.dumb_agent import DumbAgent
+from sprites import BLUE, RED, GREEN, InvalidMoveException, X, Y
+from sprites.tank import Tank
+from map.terrain import Terrain
+from sprites.weapons.base_weapon import BaseWeapon
+from sprites.weapons.landing_table import LandingTable
+
+
+NOMINAL_REWARD = 5
+RENDER_DELTA_T = 25000
+HEADLESS_DELTA_T = 900000  # Shots are swept between steps, so big steps land them in the same spot
+WEAPON_POOL_SIZE = 1  # Weapons per tank, a fired weapon is recycled so one of each kind is enough
+STATE_SIZE = 10
+
+
+class Simulation:
+    """
+    The game itself - terrain, tanks, weapons, turns and rewards - without a display, fonts or events.
+
+    Runs headless as is (training), App puts the pygame window and the keyboard on top of it.
+    """
+
+    def __init__(self, render=False, training_mode=False, ml_step_callback=None, use_landing_table=False):
+        """
+        :param use_landing_table: the opponent and the guide aim from a LandingTable of every shot on the terrain,
+                                  built fresh each game, instead of walking their shots in
+        """
+        self._running = True
+        self.size = self.width, self.height = 1024, 512
+
+        self._tank1 = None
+        self._tank2 = None
+
+        self._terrain = None
+
+        self._game_over = False
+
+        self._player_1_active = True
+
+        self._player_2 = None
+        self._player_1_guide = None
+        self._guide_state = None  # The state the guide's suggestion was made in, see get_suggested_action()
+        self._use_landing_table = use_landing_table
+        self._landing_table = None
+
+        self._restart = False
+
+        # Stuff to separtate/allow the ml to train vs user to play
+        self._training_mode = training_mode
+        self._ml_step_callback = ml_step_callback
+        self._step_result = None
+        self._ml_next_action = None
+        self._ml_primary_action = None
+        self._ml_suggested_next_action = None
+        self._step_simulation = False
+        self._action_taken = False
+        self._reward_from_ml_shot = 0
+        self.start_time = time.time()
+
+        self._render_on = render
+
+        # Written in place by get_game_state(), copied wherever it is handed out
+        self._state = np.zeros(STATE_SIZE, dtype=np.float32)
+
+        self._lock = threading.Lock()
+
+    def on_init(self, seed=None):
+        # Everything random in a game is drawn from this seed, None for a new game every time
+        rng = random.Random(seed)
+
+        self._running = True
+        self._restart = False
+        self._game_over = False
+        self._player_1_active = True
+
+        # Generate terrain, in place after the first game
+        if self._terrain is None:
+            self._terrain = Terrain(self.size, color=GREEN, seed=rng.getrandbits(32))
+        else:
+            self._terrain.generate_terrain(rng.getrandbits(32))
+
+        tank1_location_x = rng.randint(0, int(self.width/3.0))
+        tank2_location_x = rng.randint(int(2*self.width/3.0), self.width - 1)
+        tank1_location = [tank1_location_x, self._terrain.height_at_point(tank1_location_x)]
+        tank2_location = [tank2_location_x, self._terrain.height_at_point(tank2_location_x)]
+
+        # Tanks and their weapons are kept for every game after the first
+        if self._tank1 is not None:
+            self._tank1.reset(tank1_location)
+            self._tank2.reset(tank2_location)
+        else:
+            # Generate a list of weapons
+            weapons1 = []
+            for i in range(0, WEAPON_POOL_SIZE):
+                weapons1.append(BaseWeapon('BASIC_'+str(i), self.size, self._terrain, BLUE))
+
+            weapons2 = []
+            for i in range(0, WEAPON_POOL_SIZE):
+                weapons2.append(BaseWeapon('BASIC_'+str(i), self.size, self._terrain, RED))
+
+            # Setup two tanks
+            self._tank1 = Tank(screen_dimensions=self.size,
+                               location=tank1_location,
+                               weapons_list=weapons1,
+                               color=BLUE,
+                               terrain=self._terrain,
+                               name="Player 1 (You)",
+                               switch_player_callback=self._switch_player,
+                               damage_callback=self._show_damage
+                               )
+            self._tank2 = Tank(screen_dimensions=self.size,
+                               location=tank2_location,
+                               weapons_list=weapons2,
+                               color=RED,
+                               terrain=self._terrain,
+                               name="Player 2 (CPU)",
+                               switch_player_callback=self._switch_player,
+                               damage_callback=self._show_damage
+                               )
+
+            self._tank1.set_target(self._tank2)
+            self._tank2.set_target(self._tank1)
+        self._update_fire_mode()
+
+        # Shots are looked up from the terrain, rows of the table fill in as the agents aim
+        self._landing_table = LandingTable(self._terrain.get_heights()) if self._use_landing_table else None
+        self._player_2 = DumbAgent(seed=rng.getrandbits(32), landing_table=self._landing_table)
+        self._player_1_guide = DumbAgent(seed=rng.getrandbits(32), landing_table=self._landing_table)
+        self._guide_state = None
+
+        # Init ML stuff
+        self._ml_next_action = None
+        self._ml_primary_action = None
+        self._ml_suggested_next_action = None
+        self._step_simulation = False
+        self._action_taken = False
+        self._reward_from_ml_shot = 0
+        self._step_result = None
+
+        return True
+
+    def reset(self, seed=None):
+        """
+        Start a new game.
+
+        :param seed: makes the terrain, tank placement and CPU player repeatable, None for a random game
+        :return: the first state of the game
+        """
+        self.on_init(seed)
+
+        # No frame has run yet, pose the tanks like the first on_loop() would
+        self._tank1.update(0)
+        self._tank2.update(0)
+
+        return self.get_game_state().copy()
+
+    def step(self, action):
+        """
+        Apply the ML's action and run the game up to the ML's next decision: right away for a move, after the
+        CPU player's turn for a shot.
+
+        :param action: an ActionEnum value, or a MacroAction
+        :return: (state, reward, done, info)
+        """
+        assert self._training_mode, "The ML only controls player 1 in training mode."
+
+        self._step_result = None
+        self._ml_next_action = action
+        self._step_simulation = True
+        self._action_taken = False
+
+        # Same delta-t as on_execute() uses, so a step plays out exactly like a frame by frame game would
+        elapsed_time = RENDER_DELTA_T if self._render_on else HEADLESS_DELTA_T
+        while self._step_result is None:
+            if not self._running:
+                # Quit or restarted from the keyboard (App), end the game here
+                return self.get_game_state().copy(), 0, True, {'quit': not self._restart}
+
+            self._frame(elapsed_time)
+
+        state, reward, done = self._step_result
+        info = {
+            'winner': self.get_winner().get_name() if done else None,
+        }
+        return state, reward, done, info
+
+    def close(self):
+        pass
+
+    def get_game_state(self):
+        """
+           - Tank 1 location x
+           - y
+           - Tank 1 health
+           - Tank 1 Power
+           - Tank 1 Angle
+           - Tank 2 location
+           - y
+           - Tank 2 health
+           - Tank 2 Power
+           - Tank 2 Angle
+
+        :return: the state as a float32 array, reused by every call - copy it to keep it
+        """
+        state = self._state
+
+        # Tank 1
+        location = self._tank1.get_location()
+        state[StateEnum.TANK1_LOCATION_X] = location[X]
+        state[StateEnum.TANK1_LOCATION_Y] = location[Y]
+        state[StateEnum.TANK1_HEALTH] = self._tank1.get_health()
+        state[StateEnum.TANK1_POWER] = self._tank1.get_power()
+        state[StateEnum.TANK1_ANGLE] = self._tank1.get_angle()
+
+        # Tank 2
+        location = self._tank2.get_location()
+        state[StateEnum.TANK2_LOCATION_X] = location[X]
+        state[StateEnum.TANK2_LOCATION_Y] = location[Y]
+        state[StateEnum.TANK2_HEALTH] = self._tank2.get_health()
+        state[StateEnum.TANK2_POWER] = self._tank2.get_power()
+        state[StateEnum.TANK2_ANGLE] = self._tank2.get_angle()
+
+        return state
+
+    def get_suggested_action(self):
+        """
+        What the guide would have player 1 do now. The guide moves its own targets every time it acts, so it is
+        only asked again once the state has changed.
+        """
+        state = self.get_game_state()
+        if self._guide_state is None or not np.array_equal(state, self._guide_state):
+            self._ml_suggested_next_action = self._player_1_guide.act(state, target_offset=5)
+            self._guide_state = state.copy()
+        return self._ml_suggested_next_action
+
+    # Called before on_loop
+    def _handle_agents(self):
+
+        # if time.time() > self.start_time + 10:
+        #     print("HANLDE AGENTSSSSSSSS")
+        #     print(self._player_1_active)
+        #     print(self._training_mode)
+        #     print( self._step_simulation)
+
+        if not self._player_1_active:
+            if not self._tank2.is_animating():
+                try:
+                    # --------------- #
+                    # Player 2's turn #
+                    # --------------- #
+                    action = self._player_2.act(self.get_game_state())
+
+                    # Headless, play the rest of the turn out now instead of one dial unit per frame
+                    if not self._render_on:
+                        while action != ActionEnum.FIRE:
+                            self._take_unit_action(self._tank2, action)
+                            action = self._player_2.act(self.get_game_state())
+
+                        # Pose the cannon for the new dials, like the skipped frames' on_loop() would have
+                        self._tank2.update(0)
+
+                    self._take_unit_action(self._tank2, action)
+                except InvalidMoveException as e:
+                    print('Whoops! Invalid move: ' + str(e))
+
+        # ML's turn
+        else:
+
+            # If we are in ML playing mode, lets check for its next command
+            if self._training_mode:
+
+                # Marks beginning of a "Step" to the trainer
+                if self._step_simulation:
+                    if not self._tank1.is_animating():
+
+                        try:
+                            # Make sure there are no game commands
+                            if self._ml_next_action == -1:
+                                self._restart = True
+                                self._running = False
+                            elif self._ml_next_action == -2:
+                                self._restart = False
+                                self._running = False
+
+                            # No game commands, check for the next move
+                            else:
+                                # What the guide would have done, before the action changes anything
+                                self._ml_suggested_next_action = self.get_suggested_action()
+
+                                # What the guide's suggestion gets compared with
+                                self._ml_primary_action = self._ml_next_action
+                                if isinstance(self._ml_next_action, MacroAction):
+                                    self._ml_primary_action = self._ml_next_action.get_primary_action(
+                                        self._tank1.get_power(), self._tank1.get_angle())
+
+                                # Check for the ML's move
+                                if isinstance(self._ml_next_action, MacroAction):
+                                    self._take_macro_action(self._tank1, self._ml_next_action)
+                                    self._step_simulation = False
+
+                                elif self._ml_next_action == ActionEnum.LEFT:
+                                    # print("Q-Learning Agent: Moves Left.")
+                                    self._tank1.move_left()
+                                    self._action_taken = True
+                                    self._step_simulation = False
+
+                                elif self._ml_next_action == ActionEnum.RIGHT:
+                                    # print("Q-Learning Agent: Moves Right.")
+                                    self._tank1.move_right()
+                                    self._action_taken = True
+                                    self._step_simulation = False
+
+                                elif self._ml_next_action == ActionEnum.INC_PWR:
+                                    # print("Q-Learning Agent: Increases gun power.")
+                                    self._tank1.increase_power()
+                                    self._action_taken = True
+                                    self._step_simulation = False
+
+                                elif self._ml_next_action == ActionEnum.DEC_PWR:
+                                    # print("Q-Learning Agent: Decreases gun power.")
+                                    self._tank1.decrease_power()
+                                    self._action_taken = True
+                                    self._step_simulation = False
+
+                                elif self._ml_next_action == ActionEnum.INC_ANG:
+                                    # print("Q-Learning Agent: Increases gun angle.")
+                                    self._tank1.increase_angle()
+                                    self._action_taken = True
+                                    self._step_simulation = False
+
+                                elif self._ml_next_action == ActionEnum.DEC_ANG:
+                                    # print("Q-Learning Agent: Decreases gun angle.")
+                                    self._tank1.decrease_angle()
+                                    self._action_taken = True
+                                    self._step_simulation = False
+
+                                elif self._ml_next_action == ActionEnum.FIRE:
+                                    # print("Q-Learning Agent: Fires!")
+                                    self._tank1.fire()
+                                    self._step_simulation = False
+                                    self._action_taken = False  # Tells the action taken callback to not fire beciase an impact callback will fire
+                                else:
+                                    print("Unknown action: " + str(self._ml_next_action))
+
+                        except InvalidMoveException as e:
+                            print('Whoops! Invalid move: ' + str(e))
+                            # Send notification of this to AI
+                            self._handle_action_taken(True)
+
+    def _take_unit_action(self, tank, action):
+        if action == ActionEnum.LEFT:
+            tank.move_left()
+        elif action == ActionEnum.RIGHT:
+            tank.move_right()
+        elif action == ActionEnum.INC_PWR:
+            tank.increase_power()
+        elif action == ActionEnum.DEC_PWR:
+            tank.decrease_power()
+        elif action == ActionEnum.INC_ANG:
+            tank.increase_angle()
+        elif action == ActionEnum.DEC_ANG:
+            tank.decrease_angle()
+        elif action == ActionEnum.FIRE:
+            tank.fire()
+
+    def _take_macro_action(self, tank, macro):
+        # Turn the dials a unit at a time so the tank's limits still apply, stopping a dial at its limit
+        dials_turned = 0
+        for action in macro.get_unit_actions(tank.get_power(), tank.get_angle()):
+            if action == ActionEnum.FIRE:
+                continue
+            try:
+                self._take_unit_action(tank, action)
+                dials_turned += 1
+            except InvalidMoveException:
+                pass
+
+        if macro.fires():
+            # Like a FIRE, the impact callback ends the step
+            tank.fire()
+            self._action_taken = False
+        elif dials_turned == 0:
+            raise InvalidMoveException("Macro action " + str(macro) + " does not change anything.")
+        else:
+            self._action_taken = True
+
+    def _update_fire_mode(self):
+        # Shots are only worth animating when someone is watching, otherwise resolve them in one go
+        self._tank1.set_instant_resolve(not self._render_on)
+        self._tank2.set_instant_resolve(not self._render_on)
+
+    def queue_ml_action(self, action):
+        """
+        Send -1 for a restart and a -2 to quit
+
+        :param action:
+        :return:
+        """
+        with self._lock:
+            self._ml_next_action = action
+            self._step_simulation = True
+            self._action_taken = False
+
+    # def step(self):
+    #     self._step_simulation = True
+
+    def _show_damage(self, damaged_name, damage_amount):
+        # Nothing to show it on without a display
+        pass
+
+    def _calculate_reward(self, damage, distance, is_enemy=False):
+        reward = NOMINAL_REWARD
+
+        # Calculate self damage reward
+        if damage < 0:
+            reward = 0.1
+
+        else:
+            # Damage is either nothing (we missed) or we have some damage, create a reward
+            reward += damage  # Max damage is currently 20 pts
+
+        # Therefore max reward at this point is 100 + 20  (We may need to equalize the width of the screen and damage)
+
+        # Multiply the reward by the inverse of the distance normalized, so the closer we get the more reward we give
+        distance_normalized = float(distance) / float(self.size[X])
+        # print(distance)
+
+        # limit of this calculation is the width of the game screen times the max reward so 1024 * 120
+        if is_enemy:
+            # If its the enemy's shot, we only care if we get hit...give reward for damage
+            reward = - damage
+
+        else:
+            # if its our shot, we want a gradient of damage from target to landing
+            if damage >= 0:
+                # Only add in a distance penalty if we didnt self damage
+                reward *= 1 - distance_normalized
+
+        return reward
+
+    def _switch_player(self, impact_location, damage, distance):
+        # Make sure to mark the state of the game before sending a ml step callback reponse
+        if not self._tank1.is_alive() or not self._tank2.is_alive():
+            self._game_over = True
+
+        if not self._player_1_active:
+            # Tell the person who shot, where the impact landed
+            self._player_2.last_impact(impact_location)
+
+            # Our ML Went, then Player 2 went, now lets tell the ML what ended up happening
+            # if self._training_mode:
+            state_now = self.get_game_state()
+            # TODO: For now, we will only let the model train off of its own actions. Since it cant move
+            # reward = self._calculate_reward(damage, distance, is_enemy=True)
+            # reward += self._reward_from_ml_shot
+            reward = self._reward_from_ml_shot
+            if self._render_on:
+                print("REWARD - Fire: " + str(reward))
+            if self._training_mode:
+                # print("Player two fired, handle callback")
+                self._report_step(state_now, reward, self._game_over)
+            self._reward_from_ml_shot = 0  # Reset this for consistentcy
+        else:
+            # Calculate the reward from ML' sshot
+            self._reward_from_ml_shot = self._calculate_reward(damage, distance)
+
+        self._player_1_active = not self._player_1_active
+
+        self._tank1.stop_animating()
+        self._tank2.stop_animating()
+
+    # Called after handle agents
+    def on_loop(self, elapsed_time):
+        # Update Tank1
+        self._tank1.update(elapsed_time)
+
+        # update tank2
+        self._tank2.update(elapsed_time)
+
+        # Print out game status - Note this is done again to catch
+        if not self._tank1.is_alive() or not self._tank2.is_alive():
+            self._game_over = True
+
+    def get_winner(self):
+        return self._tank1 if self._tank1.is_alive() else self._tank2
+
+    def get_loser(self):
+        return self._tank2 if self._tank1.is_alive() else self._tank1
+
+    def get_player_1(self):
+        return self._tank1
+
+    def get_player_2(self):
+        return self._tank2
+
+    def get_game_summary(self):
+        return {
+            'winner': self.get_winner().get_name(),
+            'player_1': self._tank1.get_name(),
+            'player_2': self._tank2.get_name(),
+            'player_1_health': self._tank1.get_health(),
+            'player_2_health': self._tank2.get_health(),
+        }
+
+    def show_message(self, message):
+        # Nothing to show it on without a display
+        pass
+
+    def _handle_action_taken(self, no_reward=False):
+        # Generate the state, note that here a NON firing action was taken, so reward will be None(?)
+        reward = NOMINAL_REWARD  # A nominal reward amount
+
+        if self._ml_suggested_next_action != self._ml_primary_action:
+            # If the ML deviates from the guide, fail it
+            reward = NOMINAL_REWARD * 0.8
+            # print("reward zero, didnt follow guide")
+            # print("guide action: " + str(self._ml_suggested_next_action))
+
+        if no_reward:
+            # print("NO REWARD")
+            reward = 0
+
+        state_now = self.get_game_state()
+        if self._training_mode:
+            # print("HANDLE ACTION TAKEN")
+            if self._render_on:
+                print("REWARD - Action: " + str(reward))
+            self._report_step(state_now, reward, self._game_over)
+        self._action_taken = False
+
+    def _report_step(self, state, reward, done):
+        # The result of the ML's last action, picked up by step() or handed to the callback
+        state = state.copy()
+        self._step_result = (state, reward, done)
+        if self._ml_step_callback is not None:
+            self._ml_step_callback(state, reward, done)
+
+    def on_cleanup(self):
+        pass
+
+    def _frame(self, elapsed_time):
+        # One pass of the game loop
+        if self._action_taken:
+            self._handle_action_taken()
+
+        self._handle_agents()
+
+        self.on_loop(elapsed_time)
+
+    def on_execute(self):
+        # Allow a game to restart
+        while True:
+            if not self.on_init():
+                self._running = False
+                break
+            else:
+                # successful init
+                self._handle_action_taken()
+
+            # Seems to be just about the best delta-t for stepping the projectiles in
+            if self._render_on:
+                elapsed_time = RENDER_DELTA_T
+            else:
+                elapsed_time = HEADLESS_DELTA_T
+
+            # Run the main game loop
+            while self._running:
+                with self._lock:
+                    self._frame(elapsed_time)
+
+                time.sleep(0.0001)  # Allow for some unlocked time
+
+            self.on_cleanup()
+
+            if not self._restart:
+                break
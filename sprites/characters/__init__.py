@@ -5,6 +5,12 @@ from sprites import X, Y
 
 
 class Character:
+    """
+    A shape drawn about a vertex and rotated by a heading.
+
+    The polygon is only rebuilt when it is asked for after a move() that changed the pose. The pose is kept apart
+    from _vertex, since an owner can share that list and change it (e.g. Tank's location).
+    """
     def __init__(self, vertex, color):
         self._vertex = vertex
         self._color = color
@@ -12,7 +18,11 @@ class Character:
         self._heading = 0
         self._ready = False
 
+        self._pose = None  # (x, y, heading) of the last move()
+        self._polygon_pose = None  # Pose the polygon was built for
+
     def draw(self, surface):
+        # Returns the rect drawn over, None if nothing was drawn
         pass
 
     def move(self, new_x, new_y, heading=0):
@@ -20,9 +30,23 @@ class Character:
         self._vertex[X] = new_x
         self._vertex[Y] = new_y
         self._heading = heading
+        self._pose = (new_x, new_y, heading)
 
         self._ready = True
 
+    def get_polygon(self):
+        if self._polygon_pose != self._pose:
+            self._polygon = self._build_polygon(self._pose[X], self._pose[Y])
+            self._rotate_polygon()
+            self._polygon_pose = self._pose
+        return self._polygon
+
+    def _build_polygon(self, x, y):
+        """
+        The points of the shape for a vertex at x, y, before rotating it.
+        """
+        return []
+
     def _rotate_point(self, pt):
         theta = math.radians(-self._heading)  # Convert angle to radians
         cosang, sinang = cos(theta), sin(theta)
@@ -33,16 +57,17 @@ class Character:
         return [int(new_x), int(new_y)]
 
     def _rotate_polygon(self):
-        """ Rotate polygon the given angle about its vertex. """
-        theta = math.radians(self._heading)  # Convert angle to radians
+        """ Rotate polygon the given angle about its vertex (as of the last move). """
+        vertex_x, vertex_y, heading = self._pose
+        theta = math.radians(heading)  # Convert angle to radians
         cosang, sinang = cos(theta), sin(theta)
 
         new_points = []
         for p in self._polygon:
             x, y = p[X], p[Y]
-            tx, ty = x - self._vertex[X], y - self._vertex[Y]
-            new_x = (tx * cosang + ty * sinang) + self._vertex[X]
-            new_y = (-tx * sinang + ty * cosang) + self._vertex[Y]
+            tx, ty = x - vertex_x, y - vertex_y
+            new_x = (tx * cosang + ty * sinang) + vertex_x
+            new_y = (-tx * sinang + ty * cosang) + vertex_y
             new_points.append([new_x, new_y])
 
         # Save off new poly
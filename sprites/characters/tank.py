@@ -22,21 +22,20 @@ class CannonCharacter(Character):
     def get_tip(self):
         # pt = [self._vertex[X], self._vertex[Y] - CANNON_HEIGHT]
         # return self._rotate_point(pt)
-        return [int(self._polygon[2][X]), int(self._polygon[2][Y])]
+        tip = self.get_polygon()[2]
+        return [int(tip[X]), int(tip[Y])]
 
     def draw(self, surface):
         if self._ready:
-            pygame.draw.polygon(surface,
-                                self._color,
-                                self._polygon,
-                                LINE_WIDTH)
-
-    def move(self, new_x, new_y, heading=0):
-        Character.move(self, new_x, new_y, heading)
+            return pygame.draw.polygon(surface,
+                                       self._color,
+                                       self.get_polygon(),
+                                       LINE_WIDTH)
 
+    def _build_polygon(self, new_x, new_y):
         # Cannon of the tank - we will assume 0 degrees is to the right, and center the vertex of the cannon at
         #  the middle of the turret
-        self._polygon = [
+        return [
             [new_x, new_y+0.5*CANNON_WIDTH],  # LL
             [new_x, new_y-CANNON_WIDTH],  # UL
             [new_x+CANNON_HEIGHT, new_y-CANNON_WIDTH],  # UR
@@ -44,11 +43,6 @@ class CannonCharacter(Character):
             [new_x, new_y+0.5*CANNON_WIDTH],  # LL - repeat first to close poly
         ]
 
-        # Adjust the cannon's heading
-        self._rotate_polygon()
-
-        self._ready = True
-
 
 class TurretCharacter(Character):
     def __init__(self, vertex, color):
@@ -73,8 +67,14 @@ class TurretCharacter(Character):
     def move(self, new_x, new_y, heading=0):
         Character.move(self, new_x, new_y, heading)
 
-        # Move the turret poly
-        self._polygon = [
+        # Move and rotate cannon
+        self._cannon.move(new_x,
+                          new_y - 0.5*TURRET_HEIGHT,
+                          self._cannon_angle)  # Pass in the angle of the cannon to the 'heading' param
+
+    def _build_polygon(self, new_x, new_y):
+        # The turret poly, rotated to match terrain by get_polygon()
+        return [
             [new_x-0.5*TURRET_WIDTH, new_y],  # LL
             [new_x-0.5*TURRET_WIDTH, new_y-TURRET_HEIGHT],  # UL
             [new_x+0.5*TURRET_WIDTH, new_y-TURRET_HEIGHT],  # UR
@@ -82,26 +82,16 @@ class TurretCharacter(Character):
             [new_x-0.5*TURRET_WIDTH, new_y],  # LL - repeat first to close the shape
         ]
 
-        # Move and rotate cannon
-        self._cannon.move(new_x,
-                          new_y - 0.5*TURRET_HEIGHT,
-                          self._cannon_angle)  # Pass in the angle of the cannon to the 'heading' param
-
-        # Rotate to match terrain
-        self._rotate_polygon()
-
-        self._ready = True
-
     def draw(self, surface):
         if self._ready:
             # Draw the turret
-            pygame.draw.polygon(surface,
-                                self._color,
-                                self._polygon,
-                                LINE_WIDTH)
+            rect = pygame.draw.polygon(surface,
+                                       self._color,
+                                       self.get_polygon(),
+                                       LINE_WIDTH)
 
             # Draw the cannon
-            self._cannon.draw(surface)
+            return rect.union(self._cannon.draw(surface))
 
 
 class TankCharacter(Character):
@@ -129,8 +119,14 @@ class TankCharacter(Character):
     def move(self, new_x, new_y, heading=0):
         Character.move(self, new_x, new_y, heading)
 
-        # Body of tank - bottom part
-        self._polygon = [
+        # Move turret
+        self._turret.move(new_x,
+                          new_y-TANK_HEIGHT,
+                          self._heading)
+
+    def _build_polygon(self, new_x, new_y):
+        # Body of tank - bottom part, rotated to match terrain by get_polygon()
+        return [
             [new_x-0.5*TANK_WIDTH, new_y],  # LL
             [new_x-0.5*TANK_WIDTH, new_y-TANK_HEIGHT],  # UL
             [new_x+0.5*TANK_WIDTH, new_y-TANK_HEIGHT],  # UR
@@ -138,23 +134,13 @@ class TankCharacter(Character):
             [new_x-0.5*TANK_WIDTH, new_y],  # LL - repeat first to close the shape
         ]
 
-        # Move turret
-        self._turret.move(new_x,
-                          new_y-TANK_HEIGHT,
-                          self._heading)
-
-        # Rotate to match terrain
-        self._rotate_polygon()
-
-        self._ready = True
-
     def draw(self, surface):
         if self._ready:
             # Draw the body - 0
-            pygame.draw.polygon(surface,
-                                self._color,
-                                self._polygon,
-                                LINE_WIDTH)
+            rect = pygame.draw.polygon(surface,
+                                       self._color,
+                                       self.get_polygon(),
+                                       LINE_WIDTH)
 
             # Draw the turret
-            self._turret.draw(surface)
+            return rect.union(self._turret.draw(surface))
@@ -46,6 +46,34 @@ class Tank(Sprite):
         # Animation tracking
         self._is_animating = False
 
+        # (x, y, gun angle) the character was last posed for, see update()
+        self._character_pose = None
+
+    def reset(self, location):
+        """
+        Set the tank up for a new game at the given location, keeping its character and weapons.
+        """
+        # Update in place, the character shares this list
+        self._location[X] = location[X]
+        self._location[Y] = location[Y]
+        self._move_count = MOVE_COUNT_MAX
+        self._move_amt = 0
+        self._health = 100
+
+        self._gun_angle = MAX_ANGLE/4 if self._color == BLUE else MAX_ANGLE * 3/4
+        self._gun_power = MAX_POWER/2
+
+        for weapon in self._weapons:
+            weapon.recycle()
+        self._weapon_selected = 0
+
+        self._is_animating = False
+
+        # Same pose as a new tank's character, till the next update()
+        self._tank_character.set_cannon_angle(0)
+        self._tank_character.move(new_x=self._location[X], new_y=self._location[Y], heading=0)
+        self._character_pose = None
+
     def stop_animating(self):
         self._is_animating = False
 
@@ -104,17 +132,43 @@ class Tank(Sprite):
             self._step_animation(elapsed_time)
             self._weapons[self._weapon_selected].update(elapsed_time)
 
-        self._tank_character.set_cannon_angle(self._gun_angle)
-        self._tank_character.move(
-            self._location[X],
-            self._location[Y],
-            self._terrain.grade_at_point(self._location[X], TANK_WIDTH)
-        )
+        self._pose_character()
+
+    def _pose_character(self):
+        # Only re-pose the character when the tank moved or the gun turned, the terrain is fixed for a game
+        pose = (self._location[X], self._location[Y], self._gun_angle)
+        if pose != self._character_pose:
+            self._tank_character.set_cannon_angle(self._gun_angle)
+            self._tank_character.move(
+                self._location[X],
+                self._location[Y],
+                self._terrain.grade_at_point(self._location[X], TANK_WIDTH)
+            )
+            self._character_pose = pose
 
     def draw(self, surface):
-        self._tank_character.draw(surface)
+        """
+        :return: the rects drawn over
+        """
+        rects = [self.draw_body(surface), self.draw_shot(surface)]
+        return [rect for rect in rects if rect is not None]
+
+    def draw_body(self, surface):
+        return self._tank_character.draw(surface)
+
+    def draw_shot(self, surface):
+        """
+        :return: the rect drawn over, None without a shot in flight
+        """
         if self._is_animating:
-            self._weapons[self._weapon_selected].draw(surface)
+            return self._weapons[self._weapon_selected].draw(surface)
+
+    def get_shot_location(self):
+        # Where the shot in flight is drawn, None without one
+        weapon = self._weapons[self._weapon_selected]
+        if self._is_animating and weapon.is_animating():
+            return tuple(weapon.get_location())
+        return None
 
     # --------------------- #
     # Change to next weapon #
@@ -209,6 +263,8 @@ class Tank(Sprite):
             raise InvalidMoveException("Cannot play while game is animating.")
 
     def _get_cannon_tip(self):  # returns location [x, y]
+        # The dials may have turned since the last update(), pose the cannon for them first
+        self._pose_character()
         return self._tank_character.get_cannon_tip()
 
     def fire(self):
@@ -216,11 +272,19 @@ class Tank(Sprite):
         weapon = self._weapons[self._weapon_selected]
         weapon.prepare(self, self._enemy)
 
+        # Enable animation - done first since an instantly resolved shot ends the turn inside of weapon.fire()
+        self._is_animating = True
+
         # FIRE!!!!
-        weapon.fire(self._gun_angle, self._gun_power, self._get_cannon_tip(), self._impact_callback)
+        try:
+            weapon.fire(self._gun_angle, self._gun_power, self._get_cannon_tip(), self._impact_callback)
+        except InvalidMoveException:
+            self._is_animating = False
+            raise
 
-        # Enable animation
-        self._is_animating = True
+    def set_instant_resolve(self, enabled):
+        for weapon in self._weapons:
+            weapon.set_instant_resolve(enabled)
 
     # ------------------ #
     # ---- PRIVATES ---- #
@@ -229,8 +293,12 @@ class Tank(Sprite):
     def _move(self, direction):
         if not self._is_animating:
             if self._move_count != 0:
+                new_x = self._location[X] + (MOVE_DISTANCE if direction == RIGHT else - MOVE_DISTANCE)
+                if not 0 <= new_x <= self._dimension[X]:
+                    raise InvalidMoveException("Cannot move the tank off of the map.")
+
                 self._move_count -= 1
-                self._location[X] += MOVE_DISTANCE if direction == RIGHT else - MOVE_DISTANCE
+                self._location[X] = new_x
                 self._location[Y] = self._terrain.height_at_point(self._location[X])
             else:
                 # Invalid move
@@ -243,5 +311,6 @@ class Tank(Sprite):
         pass
 
     def _impact_callback(self, impact_location, damage, distance):
-        self.load_next_weapon(force=True)
+        # Hand the spent weapon back so it can be fired again
+        self._weapons[self._weapon_selected].recycle()
         self._switch_player_callback(impact_location, damage, distance)
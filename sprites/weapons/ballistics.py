@@ -0,0 +1,179 @@
+import math
+
+import numpy as np
+
+from sprites.characters.tank import TANK_HEIGHT, TURRET_HEIGHT, CANNON_HEIGHT, CANNON_WIDTH
+
+"""
+Vectorized versions of the projectile and tank math, for simulating many shots at once.
+
+They follow the same rules (and the same float operations) as BaseWeapon (_step_flight, _sweep) and the tank
+characters, so a shot simulated here lands on the same pixel as one fired in the game.
+"""
+
+GRAVITY = -9.8
+SWEEP_CHUNK = 64  # Columns checked against the terrain at once when sweeping shots, to start with
+
+
+def cannon_tip(x, y, angle):
+    """
+    Where the cannon of a tank sitting at [x, y] ends - TankCharacter.get_cannon_tip() for arrays of tanks.
+
+    :return: (x array, y array) of integer pixel locations
+    """
+    # The cannon pivots in the middle of the turret, which sits on top of the body
+    vertex_x = np.asarray(x, dtype=np.float64)
+    vertex_y = np.asarray(y, dtype=np.float64) - TANK_HEIGHT - 0.5*TURRET_HEIGHT
+
+    # Rotate the cannon's upper right corner about the pivot, like Character._rotate_polygon()
+    theta = np.asarray(angle, dtype=np.float64) * (math.pi / 180.0)
+    cosang, sinang = np.cos(theta), np.sin(theta)
+    tx, ty = CANNON_HEIGHT, -CANNON_WIDTH
+    tip_x = (tx * cosang + ty * sinang) + vertex_x
+    tip_y = (-tx * sinang + ty * cosang) + vertex_y
+    return np.trunc(tip_x).astype(np.int64), np.trunc(tip_y).astype(np.int64)
+
+
+def column_bounds(columns):
+    """
+    The x range of each pixel column. Locations are truncated to pixels, so column 0 covers (-1, 1) and every
+    other column c covers [c, c + 1) (the map has no negative columns).
+
+    :return: (low x array, high x array)
+    """
+    return np.where(columns == 0, -1.0, columns), columns + 1.0
+
+
+def sweep_shots(heights, start_x, start_y, angle, power, t_from=0.0, t_to=np.inf, chunk=SWEEP_CHUNK):
+    """
+    Sweep shots along their exact parabolas from one flight time to another, and find where each first touches
+    the ground or leaves the map. Nothing is sampled, so the result does not depend on any time step.
+
+    A shot touches the ground in the first column where it is at or below the surface while it is over that
+    column: at the moment it enters the column if it is already that low (a cliff), otherwise where it comes down
+    through the surface (y is the surface there).
+
+    :param heights: one heightfield row per shot, (shots, map width + 1) - np.broadcast_to() one row to share it
+    :param start_x: shot start locations (the cannon tips)
+    :param start_y:
+    :param angle: gun angles in degrees
+    :param power: gun powers
+    :param t_from: flight time to sweep from, scalar or one per shot
+    :param t_to: flight time to sweep to, np.inf to sweep until every shot lands
+    :param chunk: number of columns checked in the first pass, doubled every pass after
+    :return: (landed flags, landing x array, landing y array, landing time array, out of map flags), the landing
+             arrays only mean something where the landed flag is set
+    """
+    start_x = np.asarray(start_x, dtype=np.float64).reshape(-1)
+    start_y = np.asarray(start_y, dtype=np.float64).reshape(-1)
+    angle = np.asarray(angle, dtype=np.float64).reshape(-1)
+    power = np.asarray(power, dtype=np.float64).reshape(-1)
+    t_from = np.broadcast_to(np.asarray(t_from, dtype=np.float64), start_x.shape)
+    t_to = np.broadcast_to(np.asarray(t_to, dtype=np.float64), start_x.shape)
+    max_x = heights.shape[1] - 1
+
+    ux = power * np.cos(angle*math.pi/180.0)  # X velocity doesnt change
+    uy = power * np.sin(angle*math.pi/180.0)  # get initial y for calculation
+    direction = np.where(ux < 0, -1, 1)
+    safe_ux = np.where(ux == 0, 1e-12, ux)  # A shot straight up or down stays in its column for ~forever
+
+    def x_at(t):
+        return start_x + ux * t
+
+    def y_at(t, shots=slice(None)):
+        # t has a row for each of the shots, and maybe a column per pixel column
+        shape = (-1,) + (1,) * (np.ndim(t) - 1)
+        return start_y[shots].reshape(shape) + - (uy[shots].reshape(shape) * t + (0.5 * GRAVITY * t**2))
+
+    # Where the sweep starts, and when the shot leaves the map (its x truncates to a column off the map)
+    from_column = np.trunc(x_at(t_from)).astype(np.int64)
+    off_map = (from_column < 0) | (from_column > max_x)
+    exit_time = np.where(off_map, t_from,
+                         np.maximum((np.where(direction > 0, max_x + 1.0, -1.0) - start_x) / safe_ux, t_from))
+
+    # The columns to check, from the first one in the direction of flight up to where the sweep ends
+    first = from_column
+    finite_to = np.where(np.isfinite(t_to), t_to, 0.0)
+    last = np.where(np.isfinite(t_to) & (ux != 0), np.trunc(x_at(finite_to)), np.where(direction > 0, max_x, 0))
+    last = np.clip(last, 0, max_x).astype(np.int64)
+    count = np.where(off_map | ((last - first) * direction < 0), 0, (last - first) * direction + 1)
+
+    # Skip the columns a shot flies over while it is higher than the highest point of the map (by over a pixel,
+    #  locations are truncated), between the roots of y = that height
+    a = -0.5 * GRAVITY
+    peak = heights.min(axis=1) - 1.0
+    disc = uy**2 - 4*a*(start_y - peak)
+    over = (disc > 0) & (ux != 0)
+    sqrt_disc = np.sqrt(np.where(over, disc, 0.0))
+    rise, fall = (uy - sqrt_disc) / (2*a), (uy + sqrt_disc) / (2*a)
+    over &= fall > t_from
+    rise_step = np.where(rise >= t_from, (np.trunc(x_at(np.where(over, rise, 0.0))) - first) * direction + 1, 0)
+    fall_step = (np.trunc(x_at(np.where(over, fall, 0.0))) - first) * direction
+    skip_from = np.clip(rise_step, 0, count).astype(np.int64)
+    skipped = np.where(over, np.clip(fall_step, skip_from, count) - skip_from, 0).astype(np.int64)
+    count = count - skipped
+
+    # Walk the columns a chunk at a time, till each shot touches the ground or runs out of columns
+    hit_time = np.full(start_x.shape, np.inf)
+    hit_x = np.zeros(start_x.shape, dtype=np.int64)
+    hit_surface = np.zeros(start_x.shape)
+    active = np.flatnonzero(count > 0)
+    offset = 0
+    while active.size:
+        steps = offset + np.arange(chunk)
+        valid = steps < count[active, None]
+        steps = np.where(steps >= skip_from[active, None], steps + skipped[active, None], steps)
+        columns = np.clip(first[active, None] + direction[active, None] * steps, 0, max_x)
+
+        # When each shot is over each column, cut down to the sweep
+        low_x, high_x = column_bounds(columns)
+        enter = (low_x - start_x[active, None]) / safe_ux[active, None]
+        leave = (high_x - start_x[active, None]) / safe_ux[active, None]
+        enter, leave = np.minimum(enter, leave), np.maximum(enter, leave)
+        enter = np.maximum(enter, t_from[active, None])
+        leave = np.minimum(leave, t_to[active, None])
+        valid &= enter <= leave
+
+        # At or below the ground on entering, or coming down through it later. y - surface is a convex parabola in
+        #  t, so when it starts out above the surface, it next meets it at its larger root
+        surface = heights[active[:, None], columns].astype(np.float64)
+        b = -uy[active, None]
+        c = start_y[active, None] - surface
+        root = (-b + np.sqrt(np.maximum(b**2 - 4*a*c, 0.0))) / (2*a)
+        below = y_at(enter, active) >= surface
+        touch = valid & (below | (root <= leave))
+        touch_time = np.where(below, enter, np.maximum(root, enter))
+
+        # Save off the first column touched
+        found = touch.any(axis=1)
+        first_touch = touch[found].argmax(axis=1)
+        shots = active[found]
+        hit_time[shots] = touch_time[found, first_touch]
+        hit_x[shots] = columns[found, first_touch]
+        hit_surface[shots] = surface[found, first_touch]
+
+        # Most shots land within the first chunk or two, the ones still flying get bigger chunks
+        offset += chunk
+        chunk *= 2
+        active = active[~found & (count[active] > offset)]
+
+    # A shot lands where it touches the ground, unless it leaves the map first
+    hit = np.isfinite(hit_time)
+    out_of_map = (exit_time < hit_time) & (exit_time <= t_to)
+    landed = hit | out_of_map
+
+    landing_time = np.where(out_of_map, exit_time, hit_time)
+    landing_y = np.trunc(y_at(np.where(landed, landing_time, 0.0)))
+    landing_y = np.where(hit & ~out_of_map, np.maximum(landing_y, hit_surface), landing_y)
+    landing_x = np.where(out_of_map, np.where(off_map, from_column, np.where(direction > 0, max_x + 1, -1)), hit_x)
+    return landed, landing_x.astype(np.int64), landing_y.astype(np.int64), landing_time, out_of_map
+
+
+def resolve_shots(heights, start_x, start_y, angle, power):
+    """
+    Fly many shots at once until each one lands in the ground or leaves the map, see sweep_shots().
+
+    :return: (landing x array, landing y array, out of map flags)
+    """
+    _, landing_x, landing_y, _, out_of_map = sweep_shots(heights, start_x, start_y, angle, power)
+    return landing_x, landing_y, out_of_map
@@ -1,18 +1,50 @@
 import math
 from math import atan2
 
+import numpy as np
 import pygame
 from pygame.sprite import Sprite
 from math import sin, cos
 
-from map.terrain import OutOfMapException
 from sprites import InvalidMoveException, X, Y, BLUE, RED
 from sprites.characters.projectile import BasicProjectileCharacter
 from sprites.tank import Tank
+from sprites.weapons.ballistics import GRAVITY
 
-GRAVITY = -9.8
-# TODO: This causes an accuracy loss...we need to skip rendering or something instead
-TIME_REDUCTION_FACTOR = 1  # Speed up the simulation... doesnt work as expected ^
+DAMAGE_RADIUS = 40
+DAMAGE_MULTIPLIER = 0.5  # This means, that at most, there can be 20 pts damage
+# Collisions are swept between steps (see _sweep()), so this only changes how far the projectile moves per frame
+TIME_REDUCTION_FACTOR = 1  # Speed up the simulation
+
+
+class ImpactEnum:
+    FLYING = 0  # Not in the ground yet
+    SOURCE = 1  # In the ground, within the damage radius of the tank that fired
+    ENEMY = 2  # In the ground, within the damage radius of the target
+    GROUND = 3  # In the ground, missed both tanks
+    OUT_OF_MAP = 4
+
+
+class Impact:
+    """
+    What a projectile ran into, see BaseWeapon._collide().
+    """
+    def __init__(self, kind, distance=0, damage=0):
+        self._kind = kind
+        self._distance = distance  # To the tank hit, or the target when nothing was hit
+        self._damage = damage
+
+    def get_kind(self):
+        return self._kind
+
+    def get_distance(self):
+        return self._distance
+
+    def get_damage(self):
+        return self._damage
+
+    def landed(self):
+        return self._kind != ImpactEnum.FLYING
 
 
 class BaseWeapon(Sprite):
@@ -32,8 +64,8 @@ class BaseWeapon(Sprite):
         self._name = name
         self._color = color
         self._character = None
-        self._damage_radius = 40
-        self._damage_multiplier = 0.5  # This means, that at most, there can be 20 pts damage
+        self._damage_radius = DAMAGE_RADIUS
+        self._damage_multiplier = DAMAGE_MULTIPLIER
         self._damage_delt = 0
         self._distance_to_target_at_impact = 0
 
@@ -50,6 +82,7 @@ class BaseWeapon(Sprite):
         self._impact = False
         self._done = False
         self._impact_callback = None
+        self._instant_resolve = False
 
     def get_name(self):
         return self._name
@@ -60,52 +93,19 @@ class BaseWeapon(Sprite):
 
     def draw(self, surface):
         if self._is_animating:
-            self._character.draw(surface)
+            return self._character.draw(surface)
+
+    def is_animating(self):
+        return self._is_animating
+
+    def get_location(self):
+        return self._location
 
     def update(self, elapsed_time):
         # Animation
         if not self._done:
             if self._fire and not self._impact:
-                try:
-                    if not self._hit_source() and not self._hit_enemy() and not self._hit_ground():
-                        # We are flying, step it forward
-                        self._step_flight(elapsed_time)
-                        # print("stepped")
-
-                    elif self._hit_source():
-                        # OUCH! You shot yourself!!!!
-                        self._impact = True
-                        # print("hit source")
-                        self._distance_to_target_at_impact = self._distance(self._source_tank.get_location())
-                        self._damage_delt = (self._damage_radius - self._distance_to_target_at_impact) * self._damage_multiplier
-                        self._source_tank.damage(self._damage_delt)
-                        # print("hit yourself, damage: " + str(self._damage_delt))
-                        self._damage_delt *= -1  # Make damage_delt that we remember (-) if its on ourselves
-
-                    elif self._hit_enemy():
-                        # We hit the ground
-                        self._impact = True
-                        self._distance_to_target_at_impact = self._distance(self._target_tank.get_location())
-                        # print("dist when calced: " + str(self._distance_to_target_at_impact))
-                        self._damage_delt = (self._damage_radius - self._distance_to_target_at_impact) * self._damage_multiplier
-                        self._target_tank.damage(self._damage_delt)
-                        # print("hit enemy, damage: " + str(self._damage_delt))
-
-                    elif self._hit_ground():
-                        # BOOO you missed
-                        self._distance_to_target_at_impact = self._distance(self._target_tank.get_location())
-                        # print("dist when calced: " + str(self._distance_to_target_at_impact))
-                        self._impact = True
-                        # print("hit ground")
-
-                    else:
-                        # what happened here????
-                        # print("unknown")
-
-                        pass
-                except OutOfMapException:
-                    # We flew out of the map, no reasom to do any more
-                    self._impact = True
+                self._check_flight(elapsed_time)
             else:
                 # Animate the impact
                 self._done = True
@@ -113,6 +113,14 @@ class BaseWeapon(Sprite):
         else:
             self._is_animating = False
 
+    def set_instant_resolve(self, enabled):
+        """
+        When enabled, fire() flies the projectile to its impact in one call instead of one step per frame.
+
+        :param enabled: resolve shots instantly (headless) or animate them (rendering)
+        """
+        self._instant_resolve = enabled
+
     def fire(self, angle, power, from_location, impact_callback):
         if not self._is_animating:
             if not self._fire:
@@ -140,39 +148,187 @@ class BaseWeapon(Sprite):
                     from_location,
                     color=self._color
                 )
+
+                # Headless, skip the animation and go straight to the impact
+                if self._instant_resolve:
+                    self._resolve()
             else:
                 raise InvalidMoveException("Cannot fire while weapon is already firing.")
         else:
             raise InvalidMoveException("Weapon already fired.")
 
-    def is_available(self):
-        return not self._done
+    def _resolve(self):
+        # Sweep the whole rest of the flight at once, and classify the impact where it lands
+        self._sweep(np.inf)
+        self._check_impact()
 
-    def _hit_enemy(self):
-        try:
-            if self._hit_ground():
-                # If the projectile hits the ground, lets check if it hit the enemy
-                distance = self._distance(self._target_tank.get_location())
-                if distance <= self._damage_radius:
-                    return True
-        except OutOfMapException:
-            # We flew out of the map, no reasom to do any more
-            pass
+        self._done = True
+        self._is_animating = False
+        self._impact_callback(self._location, self._damage_delt, self._distance_to_target_at_impact)
+
+    def _sweep(self, to_time):
+        """
+        Sweep the flight from where the projectile is up to the given flight time, along its exact path. If it
+        touches the ground or leaves the map on the way, it is moved to that spot. Same rules as
+        ballistics.sweep_shots(), for one shot.
+
+        Terrain.first_contact() skips the columns the flight clears by over a pixel, only the rest are checked exactly.
+
+        :return: True if the projectile landed
+        """
+        ux = self._power * cos(self._angle*math.pi/180.0)
+        uy = self._power * sin(self._angle*math.pi/180.0)
+        from_time = self._elapsed_total_time
+        from_column = int(self._start_location[X] + ux * from_time)
+
+        if not self._terrain.in_map(from_column):
+            # Already off the map
+            self._location = [from_column, int(self._flight_y(uy, from_time))]
+            return True
+
+        # Find the first column the flight touches, if any
+        direction = 1 if ux >= 0 else -1
+        if ux == 0:
+            # Straight up or down, it never leaves its column
+            touch_column = from_column
+            touch_time = self._column_contact(from_column, ux, uy, from_time, to_time)
+        else:
+            last_column = int(self._start_location[X] + ux * to_time) if to_time != np.inf else \
+                (self._dimension[X] if ux > 0 else 0)
+            last_column = min(max(last_column, 0), self._dimension[X])
+            touch_column = from_column
+            touch_time = None
+            while touch_time is None and (last_column - touch_column) * direction >= 0:
+                touch_column = self._terrain.first_contact(touch_column,
+                                                           last_column,
+                                                           self._start_location,
+                                                           - uy / ux,
+                                                           - 0.5 * GRAVITY / ux**2,
+                                                           pad=1,
+                                                           margin=1)
+                if touch_column is None:
+                    break
+                touch_time = self._column_contact(touch_column, ux, uy, from_time, to_time)
+                if touch_time is None:
+                    touch_column += direction
+
+        # Leaving the map first beats touching the ground
+        exit_time = ((self._dimension[X] + 1.0 if ux > 0 else -1.0) - self._start_location[X]) / ux if ux != 0 \
+            else np.inf
+        exit_time = max(exit_time, from_time)
+        if exit_time <= to_time and (touch_time is None or exit_time < touch_time):
+            self._location = [self._dimension[X] + 1 if ux > 0 else -1, int(self._flight_y(uy, exit_time))]
+            self._elapsed_total_time = exit_time
+            return True
+
+        if touch_time is not None:
+            surface = self._terrain.height_at_point(touch_column)
+            self._location = [touch_column, max(int(self._flight_y(uy, touch_time)), surface)]
+            self._elapsed_total_time = touch_time
+            return True
 
         return False
 
-    def _hit_source(self):
-        try:
-            if self._hit_ground():
-                # If the projectile hits the ground, lets check if it hit the source
-                distance = self._distance(self._source_tank.get_location())
-                if distance <= self._damage_radius:
-                    return True
-        except OutOfMapException:
+    def _column_contact(self, column, ux, uy, from_time, to_time):
+        """
+        When the flight first touches the ground over one column, between two flight times.
+
+        :return: the flight time, None if it does not touch it
+        """
+        # When the projectile is over the column. Locations are truncated, so column 0 is (-1, 1), c is [c, c + 1)
+        low_x = -1.0 if column == 0 else float(column)
+        high_x = column + 1.0
+        if ux != 0:
+            enter = (low_x - self._start_location[X]) / ux
+            leave = (high_x - self._start_location[X]) / ux
+            enter, leave = min(enter, leave), max(enter, leave)
+        else:
+            enter, leave = -np.inf, np.inf
+        enter = max(enter, from_time)
+        leave = min(leave, to_time)
+        if enter > leave:
+            return None
+
+        # At or below the ground on entering, or coming down through it later (the larger root of y = surface)
+        surface = self._terrain.height_at_point(column)
+        if self._flight_y(uy, enter) >= surface:
+            return enter
+        a = -0.5 * GRAVITY
+        root = (uy + math.sqrt(max(uy**2 - 4*a*(self._start_location[Y] - surface), 0.0))) / (2*a)
+        return max(root, enter) if root <= leave else None
+
+    def _flight_y(self, uy, flight_time):
+        return self._start_location[Y] + - (uy * flight_time + (0.5 * GRAVITY * flight_time**2))
+
+    def _check_flight(self, elapsed_time):
+        # Sweep to where this step would take us, stopping at the ground or the edge of the map
+        if self._sweep(self._elapsed_total_time + (elapsed_time / (1000000.0/TIME_REDUCTION_FACTOR))):
+            self._check_impact()
+        else:
+            # We are flying, step it forward
+            self._step_flight(elapsed_time)
+
+    def _check_impact(self):
+        impact = self._collide()
+        if impact.landed():
+            self._apply_impact(impact)
+
+    def _collide(self):
+        """
+        Work out what the projectile ran into at its current location: the map bounds, the ground and then the
+        tanks' damage radii, each looked at once.
+
+        :return: an Impact
+        """
+        x, y = self._location[X], self._location[Y]
+        if not self._terrain.in_map(x):
             # We flew out of the map, no reasom to do any more
-            pass
+            return Impact(ImpactEnum.OUT_OF_MAP)
+
+        if self._terrain.height_at_point(x) > y:
+            return Impact(ImpactEnum.FLYING)
+
+        # In the ground, the tank that fired comes first
+        distance = self._distance(self._source_tank.get_location())
+        if distance <= self._damage_radius:
+            return Impact(ImpactEnum.SOURCE, distance, (self._damage_radius - distance) * self._damage_multiplier)
+
+        distance = self._distance(self._target_tank.get_location())
+        if distance <= self._damage_radius:
+            return Impact(ImpactEnum.ENEMY, distance, (self._damage_radius - distance) * self._damage_multiplier)
+
+        # BOOO you missed
+        return Impact(ImpactEnum.GROUND, distance)
+
+    def _apply_impact(self, impact):
+        self._impact = True
+        self._distance_to_target_at_impact = impact.get_distance()
+        self._damage_delt = impact.get_damage()
+
+        if impact.get_kind() == ImpactEnum.SOURCE:
+            # OUCH! You shot yourself!!!!
+            self._source_tank.damage(self._damage_delt)
+            self._damage_delt *= -1  # Make damage_delt that we remember (-) if its on ourselves
+        elif impact.get_kind() == ImpactEnum.ENEMY:
+            self._target_tank.damage(self._damage_delt)
+
+    def recycle(self):
+        """
+        Make a spent weapon ready to fire again, so a tank can keep firing the same one.
+        """
+        self._location = (-1, -1)  # Back off screen till used
+        self._damage_delt = 0
+        self._distance_to_target_at_impact = 0
+        self._elapsed_total_time = 0
 
-        return False
+        self._is_animating = False
+        self._fire = False
+        self._impact = False
+        self._done = False
+        self._impact_callback = None
+
+    def is_available(self):
+        return not self._done
 
     def _distance(self, location):
         x_target = location[X]
@@ -182,9 +338,6 @@ class BaseWeapon(Sprite):
         # print(self._location)
         return math.sqrt((x_target - self._location[X])**2 + (y_target - self._location[Y])**2)
 
-    def _hit_ground(self):
-        return self._terrain.intersects_terrain(self._location)
-
     def _step_flight(self, elapsed_time):
         # Save of the simulated distance
         self._elapsed_total_time += (elapsed_time / (1000000.0/TIME_REDUCTION_FACTOR))  # Elapsed comes in millis
@@ -209,6 +362,9 @@ class BaseWeapon(Sprite):
         #
         # print("Delta x: " + str(self._location[X] - new_x))
 
+        # Save off new locations
+        self._location = [new_x, new_y]
+
         # Calculate projectile heading
         heading = - (360 + ((atan2((self._super_old_location[Y] - new_y), (self._super_old_location[X] - new_x)) * 180.0 / math.pi) - 180))
         # print("**HEADING :" + str(heading))
@@ -216,9 +372,6 @@ class BaseWeapon(Sprite):
         # Move the character
         self._character.move(new_x=new_x, new_y=new_y, heading=heading)
 
-        # Save off new locations
-        self._location = [new_x, new_y]
-
         # Save off a super old location every 5 steps
         if self._super_old_count == 5:
             self._super_old_location[X] = new_x
@@ -0,0 +1,124 @@
+import numpy as np
+
+from sprites import X, Y
+from sprites.tank import MIN_POWER, MAX_POWER
+from sprites.weapons.ballistics import cannon_tip, sweep_shots
+from sprites.weapons.base_weapon import ImpactEnum, DAMAGE_RADIUS, DAMAGE_MULTIPLIER
+
+
+class LandingTable:
+    """
+    Where every shot lands on one terrain: (shooter location, angle, power) -> landing x and what was hit, by the
+    same rules as BaseWeapon.
+
+    Rows hold every power for one shooter, enemy and angle. A row is flown (all its shots at once, see
+    ballistics.sweep_shots()) the first time it is asked for and kept for the rest of the game, so looking a shot up
+    is O(1) and aiming at a target is O(log powers) per angle after that.
+    """
+    def __init__(self, heights):
+        """
+        :param heights: the terrain's heightfield, Terrain.get_heights()
+        """
+        self._heights = heights
+        self._powers = np.arange(MIN_POWER, MAX_POWER + 1)
+        self._rows = {}  # (shooter x, shooter y, enemy x, enemy y, angle): row, see _fly_row()
+
+    def landing(self, shooter_location, enemy_location, angle, power):
+        """
+        :return: (landing x, ImpactEnum value) of one shot
+        """
+        row = self._get_row(shooter_location, enemy_location, angle)
+        i = int(power) - MIN_POWER
+        return int(row['x'][i]), int(row['kind'][i])
+
+    def get_row(self, shooter_location, enemy_location, angle):
+        """
+        :return: (landing x array, ImpactEnum value array, damage array) indexed by power - MIN_POWER
+        """
+        row = self._get_row(shooter_location, enemy_location, angle)
+        return row['x'], row['kind'], row['damage']
+
+    def aim(self, shooter_location, enemy_location, angles, target_x=None):
+        """
+        The best shot at a target, out of the given angles and every power.
+
+        Aiming at the enemy (no target_x), the shot that does the most damage to it wins. Otherwise, and when no
+        shot reaches the enemy, it is the shot that lands closest to the target. Shots that leave the map or hit the
+        shooter are never picked.
+
+        :param angles: angles to consider
+        :param target_x: x to land at, None for the enemy
+        :return: (angle, power), None if every shot leaves the map or hits the shooter
+        """
+        aim_at_enemy = target_x is None
+        if aim_at_enemy:
+            target_x = enemy_location[X]
+
+        best = None
+        best_score = None
+        for angle in angles:
+            row = self._get_row(shooter_location, enemy_location, angle)
+            if aim_at_enemy and row['best_hit'] is not None:
+                # Scores sort hits on the enemy, most damage first, ahead of near misses
+                power = row['best_hit']
+                score = (0, -row['damage'][power - MIN_POWER])
+            else:
+                power = self._closest_power(row, target_x)
+                if power is None:
+                    continue
+                score = (1, abs(row['x'][power - MIN_POWER] - target_x))
+
+            if best_score is None or score < best_score:
+                best, best_score = (int(angle), power), score
+
+        return best
+
+    def _closest_power(self, row, target_x):
+        # Binary search the usable landings, sorted by x
+        xs = row['sorted_x']
+        if xs.size == 0:
+            return None
+        i = int(np.searchsorted(xs, target_x))
+        candidates = [j for j in (i - 1, i) if 0 <= j < xs.size]
+        j = min(candidates, key=lambda k: abs(xs[k] - target_x))
+        return int(row['sorted_power'][j])
+
+    def _get_row(self, shooter_location, enemy_location, angle):
+        key = (int(shooter_location[X]), int(shooter_location[Y]), int(enemy_location[X]), int(enemy_location[Y]),
+               int(angle))
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = self._fly_row(*key)
+        return row
+
+    def _fly_row(self, shooter_x, shooter_y, enemy_x, enemy_y, angle):
+        shots = self._powers.size
+        start_x, start_y = cannon_tip(np.full(shots, shooter_x), np.full(shots, shooter_y), np.full(shots, angle))
+        _, xs, ys, _, out_of_map = sweep_shots(np.broadcast_to(self._heights, (shots, self._heights.size)),
+                                               start_x, start_y, np.full(shots, angle), self._powers)
+
+        # Classify the landings like BaseWeapon._collide(), the shooter comes first
+        source_distance = np.sqrt((shooter_x - xs)**2 + (shooter_y - ys)**2)
+        enemy_distance = np.sqrt((enemy_x - xs)**2 + (enemy_y - ys)**2)
+        hit_source = ~out_of_map & (source_distance <= DAMAGE_RADIUS)
+        hit_enemy = ~out_of_map & ~hit_source & (enemy_distance <= DAMAGE_RADIUS)
+        kind = np.select([out_of_map, hit_source, hit_enemy],
+                         [ImpactEnum.OUT_OF_MAP, ImpactEnum.SOURCE, ImpactEnum.ENEMY],
+                         ImpactEnum.GROUND)
+        damage = np.where(hit_enemy, (DAMAGE_RADIUS - enemy_distance) * DAMAGE_MULTIPLIER,
+                          np.where(hit_source, -(DAMAGE_RADIUS - source_distance) * DAMAGE_MULTIPLIER, 0.0))
+
+        # For aiming: the best hit on the enemy, and the usable landings sorted by x
+        usable = np.flatnonzero((kind == ImpactEnum.ENEMY) | (kind == ImpactEnum.GROUND))
+        order = usable[np.argsort(xs[usable], kind='stable')]
+        best_hit = int(self._powers[np.argmax(damage)]) if hit_enemy.any() else None
+
+        return {
+            'x': xs,
+            'kind': kind,
+            'damage': damage,
+            'best_hit': best_hit,
+            'sorted_x': xs[order],
+            'sorted_power': self._powers[order],
+        }
+
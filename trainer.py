@@ -1,14 +1,13 @@
+import functools
 import os
-import threading
 import time
-from collections import deque
 
 import numpy as np
 
-from threading import Thread
-
-from agents.dqn_agent import DqnAgent
-from main import App
+from agents import MACRO_ACTIONS
+from agents.replay_memory import PRIORITY_ALPHA, PRIORITY_BETA, ANNEAL_STEPS
+from rollout import RolloutWorkers
+from simulation import Simulation
 
 
 # Number of games to play
@@ -17,201 +16,235 @@ from utils.logger import DataLogger
 n_episodes = 10000
 save_period = 50  # Saves off every n episodes' model
 batch_size = 32  # multiples of 2
+gradient_steps = 1  # Minibatches trained on after every game
+memory_size = 100000  # Transitions kept for replay, oldest are dropped first
+prioritized_replay = False  # Replay the transitions the model gets most wrong more often
+priority_alpha = PRIORITY_ALPHA  # How much the priorities count, 0 is uniform sampling
+priority_alpha_end = None  # Alpha after priority_anneal_steps minibatches, None keeps priority_alpha
+priority_beta = PRIORITY_BETA  # How much the importance sampling weights correct for the priorities
+priority_beta_end = 1.0  # Beta after priority_anneal_steps minibatches
+priority_anneal_steps = ANNEAL_STEPS  # Minibatches alpha and beta change linearly over
+backend = 'keras'  # 'keras' or 'numpy' - the NumPy agent trains these small models without loading TensorFlow
 
 state_size = 10
 action_size = 5  # 7 if we want to move, not doing that for now
+macro_actions = False  # Pick from agents.MACRO_ACTIONS, turning a dial several units (or firing) in one step
 
 output_dir = 'models/'
 
-
-class Handler:
-    def __init__(self):
-        self.lock = threading.Lock()
-        self.callback_triggered = False
-
-        self.next_state = None
-        self.reward = None
-        self.game_over = None
-
-    def callback(self, next_state, reward, game_over):
-        with self.lock:
-            # print("SET TRUE")
-            self.callback_triggered = True
-
-            self.next_state = next_state
-            self.reward = reward
-            self.game_over = game_over
-
-    def wait_for_callback(self,):
-        while True:
-            with self.lock:
-                if self.callback_triggered:
-                    # print("Next State received!")
-                    self.callback_triggered = False
-                    break
-
-            time.sleep(0.0001)
-
-        return self.next_state, self.reward, self.game_over
-
-
-# Setup our output dir
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
-
-# Create a game environment
-handler = Handler()
-game = App(training_mode=True, ml_step_callback=handler.callback)
-thread = Thread(target=game.on_execute)
-thread.start()
-
-# Create the agent
-agent = DqnAgent(state_size, action_size, force_continue=True)  # Set true to continue with low epsilon and loaded model
-
-# Create a data logger
-logger = DataLogger(
-    n_episodes,
-    save_period,
-    batch_size,
-    state_size,
-    action_size
-)
-
-# Let the game start up
-time.sleep(5)
-
-# Track some times
-last_play_time = 0
-last_train_time = 0
-
-# Sliding window so we can check the winning rate, and see if its increasing
-winners_window = []
-window_size = int(n_episodes*0.1)
-p1_win_ratio = 0
-p2_win_ratio = 0
-
-# Track winner count
-winners = {}
-
-# Play n_episodes count games
-for e in range(n_episodes): # iterate over new episodes of the game
-    try:
-        # Reset the state of the game with a restart, wait for it to take
-        print("Resetting game state...")
-        game.queue_ml_action(-1)  # -1 restarts, -2 quits
-        _ = handler.wait_for_callback()
-        state = np.reshape(game.get_game_state(), [1, state_size])
-        game_over = False
-        print("Reset. Starting game " + str(e))
-
-        time_start = time.time()
-        msg = "Game " + str(e + 1) + " of " + str(n_episodes) + ",  LPT: " + \
-              str(last_play_time) + ", LTT: " + str(last_train_time) + ", epsilon: " + str(agent.get_epsilon())
-        game.show_message(msg)
-        print(msg)
-
-        for winner in winners:
-            print(winner + " has " + str(winners[winner]) + " wins so far.")
-
-        while not game_over:
-
-            # print("**********************************************")
-            # print("****************** NEW ROUND *****************")
-            # print("**********************************************")
-            # Make our agent act
-            action = agent.act(state)
-            # print("queue action: " + str(action))
-            game.queue_ml_action(action)  # Sends the 'step' commanad
-
-            # Get the next state, etc from the action
-            # print("wait for next state")
-            next_state, reward, game_over = handler.wait_for_callback()
-            # print("handle next state")
-
-            # Remember the action
-            next_state = np.reshape(next_state, [1, state_size])
-            agent.remember(state, action, reward, next_state, game_over)
-
-            # Save off this round
-            #logger.add_step({
-            #    "state": state,
-            #    "action": action,
-            #    "reward": reward,
-            #    "next_state": next_state,
-            #    "game_over": game_over
-            #})
-
-            # Save the state as next state
-            state = next_state
-
-            if game_over:
-                print("GAME OVER: " + game.get_winner().get_name() + " wins!")
-                if game.get_winner().get_name() not in winners:
-                    winners[game.get_winner().get_name()] = 1
-                else:
-                    winners[game.get_winner().get_name()] += 1
-
-                winners_window.append(game.get_winner().get_name())
-
-        print("episode: {}/{}, e: {:.2}"  # print the episode's score and agent's epsilon
-              .format(e, n_episodes, agent.get_epsilon()))
-
-        game_end = time.time()
-
-        # Train the agent off the game we just played
-        if len(agent.get_memory()) > batch_size:
-            agent.replay(batch_size)
-
-        train_end = time.time()
-
-        last_play_time = (int((game_end-time_start) / 60 * 10000)) / 10000
-        last_train_time = (int((train_end-game_end) / 60 * 10000)) / 10000
-
-        print("Playing took: " + str(last_play_time) + " minutes.")
-        print("Training took: " + str(last_train_time) + " minutes.")
-
-        if len(winners_window) == window_size:
-            win_count_1 = winners_window.count(game.get_player_1().get_name())
-            win_count_2 = winners_window.count(game.get_player_2().get_name())
-            p1_win_ratio = win_count_1/window_size
-            p2_win_ratio = win_count_2/window_size
-            winners_window = []
-
-        print("Player 1 win ratio: " + str(p1_win_ratio))
-        print("Player 2 win ratio: " + str(p2_win_ratio))
-
-        logger.add_game({
-            "winner": "Player 1" if game.get_winner() == game.get_player_1() else "Player 2",
-            "play_time": last_play_time,
-            "train_time": last_train_time,
-            "epsilon": agent.get_epsilon(),
-            "player_1_health": game.get_player_1().get_health(),
-            "player_2_health": game.get_player_2().get_health(),
-            "p1_win_ratio": p1_win_ratio,
-            "p2_win_ratio": p2_win_ratio
-        })
-
-        # Save off every 50 episodes
-        if e % save_period == 0:
-            agent.save(output_dir + "weights_" + '{:04d}'.format(e + agent.restart_file_number_offset) + ".hdf5")
-            logger.write_object_to_file()
-
-        logger.add_any('winners', winners)
-    except KeyboardInterrupt:
-        break
-
-
-# End game
-print("Ending game...")
-game.queue_ml_action(-2)
-print("Ended.")
-
-
-print("Writing out log file...")
-logger.write_object_to_file()
-print("Log written")
-
-
-print("Showing win graphs...")
-logger.show_graphs()
-print("Graphs closed.")
+render = False  # Train in a pygame window (press 'h' to toggle drawing) instead of fully headless
+viewer = False  # Train headless in a pygame window that draws a sample of the frames ('[' and ']' for speed)
+
+n_workers = 0  # Rollout worker processes playing games for the learner, 0 plays the games in this process
+weight_sync_period = 10  # Episodes between sending the learner's weights to the rollout workers
+rollout_seed = None  # Seed for the workers' games, None for random games
+
+
+def get_agent_class():
+    # Imported here so only the chosen backend gets loaded, in the trainer and in every rollout worker
+    if backend == 'numpy':
+        from agents.numpy_dqn_agent import NumpyDqnAgent
+        return NumpyDqnAgent
+
+    from agents.dqn_agent import DqnAgent
+    return DqnAgent
+
+
+def play_game(game, agent, action_table=None):
+    """
+    Play one game in this process, remembering every step.
+
+    :param action_table: what the agent's action indexes stand for (e.g. MACRO_ACTIONS), None for ActionEnum values
+    :return: the game summary, None if the game window was closed
+    """
+    state = np.reshape(game.reset(), [1, state_size])
+    game_over = False
+    while not game_over:
+
+        # print("**********************************************")
+        # print("****************** NEW ROUND *****************")
+        # print("**********************************************")
+        # Make our agent act
+        action = agent.act(state)
+
+        # Get the next state, etc from the action
+        next_state, reward, game_over, info = game.step(action if action_table is None else action_table[action])
+        if info.get('quit', False):
+            return None
+
+        # Remember the action
+        next_state = np.reshape(next_state, [1, state_size])
+        agent.remember(state, action, reward, next_state, game_over)
+
+        # Save the state as next state
+        state = next_state
+
+    return game.get_game_summary()
+
+
+if __name__ == '__main__':
+    # Setup our output dir
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    # What the agent's actions stand for
+    action_table = None
+    force_continue = True
+    if macro_actions:
+        action_table = MACRO_ACTIONS
+        action_size = len(MACRO_ACTIONS)
+
+        # The saved models pick from the 5 unit actions, their output layer does not fit the macro actions
+        force_continue = False
+        print("Macro actions: starting a new model, the saved ones in " + output_dir + " have " +
+              "a different number of actions.")
+
+    # Create the agent, set force_continue true to continue with low epsilon and loaded model
+    agent_class = get_agent_class()
+    agent = agent_class(state_size, action_size, force_continue=force_continue, gradient_steps=gradient_steps,
+                        memory_size=memory_size, prioritized_replay=prioritized_replay,
+                        replay_options={
+                            'alpha': priority_alpha,
+                            'alpha_end': priority_alpha_end,
+                            'beta': priority_beta,
+                            'beta_end': priority_beta_end,
+                            'anneal_steps': priority_anneal_steps,
+                        })
+
+    # Create a game environment, or workers that each play their own
+    game = None
+    workers = None
+    if n_workers > 0:
+        workers = RolloutWorkers(n_workers, functools.partial(agent_class, state_size, action_size), state_size,
+                                 seed=rollout_seed, action_table=action_table)
+        workers.start()
+        workers.sync_weights(agent)
+    elif render or viewer:
+        from main import App
+        game = App(render=render and not viewer, training_mode=True, viewer=viewer)
+    else:
+        game = Simulation(training_mode=True)
+
+    # Create a data logger
+    logger = DataLogger(
+        n_episodes,
+        save_period,
+        batch_size,
+        state_size,
+        action_size
+    )
+
+    # Track some times
+    last_play_time = 0
+    last_train_time = 0
+
+    # Sliding window so we can check the winning rate, and see if its increasing
+    winners_window = []
+    window_size = int(n_episodes*0.1)
+    p1_win_ratio = 0
+    p2_win_ratio = 0
+
+    # Track winner count
+    winners = {}
+
+    # Play n_episodes count games
+    for e in range(n_episodes): # iterate over new episodes of the game
+        try:
+            time_start = time.time()
+            msg = "Game " + str(e + 1) + " of " + str(n_episodes) + ",  LPT: " + \
+                  str(last_play_time) + ", LTT: " + str(last_train_time) + ", epsilon: " + str(agent.get_epsilon())
+            print(msg)
+
+            for winner in winners:
+                print(winner + " has " + str(winners[winner]) + " wins so far.")
+
+            if workers is not None:
+                # Take in the workers' steps until one of them finishes a game
+                summary = workers.next_episode(agent)
+            else:
+                print("Starting game " + str(e))
+                game.show_message(msg)
+                summary = play_game(game, agent, action_table)
+
+            if summary is None:
+                # Game window closed
+                break
+
+            print("GAME OVER: " + summary['winner'] + " wins!")
+            if summary['winner'] not in winners:
+                winners[summary['winner']] = 1
+            else:
+                winners[summary['winner']] += 1
+
+            winners_window.append(summary['winner'])
+
+            print("episode: {}/{}, e: {:.2}"  # print the episode's score and agent's epsilon
+                  .format(e, n_episodes, agent.get_epsilon()))
+
+            game_end = time.time()
+
+            # Train the agent off the game we just played
+            if len(agent.get_memory()) > batch_size:
+                agent.replay(batch_size)
+
+            # Keep the workers playing with the latest model
+            if workers is not None and e % weight_sync_period == 0:
+                workers.sync_weights(agent)
+
+            train_end = time.time()
+
+            last_play_time = (int((game_end-time_start) / 60 * 10000)) / 10000
+            last_train_time = (int((train_end-game_end) / 60 * 10000)) / 10000
+
+            print("Playing took: " + str(last_play_time) + " minutes.")
+            print("Training took: " + str(last_train_time) + " minutes.")
+
+            if len(winners_window) == window_size:
+                win_count_1 = winners_window.count(summary['player_1'])
+                win_count_2 = winners_window.count(summary['player_2'])
+                p1_win_ratio = win_count_1/window_size
+                p2_win_ratio = win_count_2/window_size
+                winners_window = []
+
+            print("Player 1 win ratio: " + str(p1_win_ratio))
+            print("Player 2 win ratio: " + str(p2_win_ratio))
+
+            logger.add_game({
+                "winner": "Player 1" if summary['winner'] == summary['player_1'] else "Player 2",
+                "play_time": last_play_time,
+                "train_time": last_train_time,
+                "epsilon": agent.get_epsilon(),
+                "player_1_health": summary['player_1_health'],
+                "player_2_health": summary['player_2_health'],
+                "p1_win_ratio": p1_win_ratio,
+                "p2_win_ratio": p2_win_ratio
+            })
+
+            # Save off every 50 episodes
+            if e % save_period == 0:
+                agent.save(output_dir + "weights_" + '{:04d}'.format(e + agent.restart_file_number_offset) +
+                           agent.WEIGHT_FILE_TYPES[0])
+                logger.write_object_to_file()
+
+            logger.add_any('winners', winners)
+        except KeyboardInterrupt:
+            break
+
+
+    # End game
+    print("Ending game...")
+    if workers is not None:
+        workers.stop()
+    else:
+        game.close()
+    print("Ended.")
+
+
+    print("Writing out log file...")
+    logger.write_object_to_file()
+    print("Log written")
+
+
+    print("Showing win graphs...")
+    logger.show_graphs()
+    print("Graphs closed.")
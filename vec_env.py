@@ -0,0 +1,208 @@
+import numpy as np
+
+from agents import ActionEnum, StateEnum
+from agents.dumb_agent import BatchDumbAgent
+from map.terrain import generate_heightfield
+from simulation import NOMINAL_REWARD, STATE_SIZE
+from sprites import X
+from sprites.tank import MAX_ANGLE, MIN_ANGLE, MAX_POWER, MIN_POWER, MOVE_DISTANCE, MOVE_COUNT_MAX
+from sprites.weapons.ballistics import cannon_tip, resolve_shots
+from sprites.weapons.base_weapon import DAMAGE_RADIUS, DAMAGE_MULTIPLIER
+
+PLAYER_1 = 0
+PLAYER_2 = 1
+
+START_HEALTH = 100
+
+
+class VecEnv:
+    """
+    Many independent games stepped together, with the state of every game kept in NumPy arrays.
+
+    Each game plays by the same rules as Simulation in training mode: player 1 is the ML (one action per step),
+    player 2 is a DumbAgent and a DumbAgent guide grades the ML's non firing actions. A step runs up to the ML's
+    next decision, so a FIRE step also plays out the CPU player's whole turn. Finished games are reset right
+    away; their last state is in info['terminal_state'].
+
+    Differences from Simulation: the guide is asked every step (not only when the state has changed), the CPU
+    player cannot get stuck turning a dial past its limit.
+    """
+    def __init__(self, num_envs, size=(1024, 512)):
+        self.num_envs = num_envs
+        self.size = size
+        self._random = np.random.default_rng()
+
+        # Game state, one row per game. Tank columns are PLAYER_1, PLAYER_2
+        self._heights = np.zeros((num_envs, size[X] + 1), dtype=np.int32)
+        self._tank_x = np.zeros((num_envs, 2), dtype=np.int64)
+        self._tank_y = np.zeros((num_envs, 2), dtype=np.int64)
+        self._health = np.zeros((num_envs, 2), dtype=np.int64)
+        self._power = np.zeros((num_envs, 2))
+        self._angle = np.zeros((num_envs, 2))
+        self._move_count = np.zeros((num_envs, 2), dtype=np.int64)
+
+        # CPU player and the ML's guide
+        self._player_2 = BatchDumbAgent(num_envs)
+        self._player_1_guide = BatchDumbAgent(num_envs)
+
+        self._states = np.zeros((num_envs, STATE_SIZE), dtype=np.float32)
+
+    def reset(self, seed=None):
+        """
+        Start a new game in every env.
+
+        :param seed: makes the games repeatable, None for random games
+        :return: the first states, (num_envs, STATE_SIZE)
+        """
+        self._random = np.random.default_rng(seed)
+        self._player_2 = BatchDumbAgent(self.num_envs, seed=self._random.integers(2**32))
+        self._player_1_guide = BatchDumbAgent(self.num_envs, seed=self._random.integers(2**32))
+
+        self._reset_games(np.arange(self.num_envs))
+        return self._observe().copy()
+
+    def step(self, actions):
+        """
+        Apply one ML action per game and run every game up to its next decision.
+
+        :param actions: ActionEnum value per game
+        :return: (states, rewards, dones, info) - one row/entry per game
+        """
+        actions = np.asarray(actions)
+        games = np.arange(self.num_envs)
+        power = self._power[:, PLAYER_1]
+        angle = self._angle[:, PLAYER_1]
+
+        # What the guide would have done, before the action changes anything
+        suggested = self._player_1_guide.act(games, power, angle, self._tank_x[:, PLAYER_2])
+
+        # Dial and move actions, with the same limits as Tank
+        inc_ang = actions == ActionEnum.INC_ANG
+        dec_ang = actions == ActionEnum.DEC_ANG
+        inc_pwr = actions == ActionEnum.INC_PWR
+        dec_pwr = actions == ActionEnum.DEC_PWR
+        left = actions == ActionEnum.LEFT
+        right = actions == ActionEnum.RIGHT
+        fire = actions == ActionEnum.FIRE
+
+        new_x = self._tank_x[:, PLAYER_1] + np.where(right, MOVE_DISTANCE, -MOVE_DISTANCE)
+        can_move = (self._move_count[:, PLAYER_1] != 0) & (new_x >= 0) & (new_x <= self.size[X])
+
+        valid = np.select(
+            [inc_ang, dec_ang, inc_pwr, dec_pwr, left | right],
+            [angle < MAX_ANGLE, angle > MIN_ANGLE, power < MAX_POWER, power > MIN_POWER, can_move],
+            fire
+        )
+
+        angle += (inc_ang & valid).astype(np.float64) - (dec_ang & valid)
+        power += (inc_pwr & valid).astype(np.float64) - (dec_pwr & valid)
+        moved = (left | right) & valid
+        self._tank_x[moved, PLAYER_1] = new_x[moved]
+        self._tank_y[moved, PLAYER_1] = self._heights[moved, new_x[moved]]
+        self._move_count[moved, PLAYER_1] -= 1
+
+        # Reward following the guide
+        rewards = np.where(actions == suggested, NOMINAL_REWARD, NOMINAL_REWARD * 0.8)
+        rewards[~valid] = 0
+
+        # Shots, then the CPU player's whole turn
+        shooting = np.flatnonzero(fire)
+        if shooting.size:
+            damage, distance, _ = self._shoot(shooting, PLAYER_1)
+            rewards[shooting] = self._calculate_reward(damage, distance)
+
+            self._player_2.update_targets(shooting, self._tank_x[shooting, PLAYER_1])
+            target_pwr, target_ang = self._player_2.get_targets(shooting)
+            self._power[shooting, PLAYER_2] = np.clip(target_pwr, MIN_POWER, MAX_POWER)
+            self._angle[shooting, PLAYER_2] = np.clip(target_ang, MIN_ANGLE, MAX_ANGLE)
+            self._player_2.fired(shooting)
+
+            _, _, impact_x = self._shoot(shooting, PLAYER_2)
+            self._player_2.last_impact(shooting, impact_x)
+
+        dones = (self._health <= 0).any(axis=1)
+        winners = np.where(self._health[:, PLAYER_1] > 0, PLAYER_1, PLAYER_2)
+        info = {
+            'winner': np.where(dones, winners, -1),
+            'terminal_state': self._observe()[dones].copy(),
+        }
+
+        # Start the finished games over
+        if dones.any():
+            self._reset_games(np.flatnonzero(dones))
+
+        return self._observe().copy(), rewards, dones, info
+
+    def _reset_games(self, games):
+        width = self.size[X]
+        for game in games:
+            self._heights[game] = generate_heightfield(self.size, self._random.integers(2**32))
+
+        self._tank_x[games, PLAYER_1] = self._random.integers(0, int(width/3.0) + 1, size=games.size)
+        self._tank_x[games, PLAYER_2] = self._random.integers(int(2*width/3.0), width, size=games.size)
+        self._tank_y[games] = self._heights[games[:, None], self._tank_x[games]]
+
+        self._health[games] = START_HEALTH
+        self._power[games] = MAX_POWER/2
+        self._angle[games, PLAYER_1] = MAX_ANGLE/4
+        self._angle[games, PLAYER_2] = MAX_ANGLE * 3/4
+        self._move_count[games] = MOVE_COUNT_MAX
+
+        self._player_2.reset(games)
+        self._player_1_guide.reset(games)
+
+    def _shoot(self, games, player):
+        """
+        Fire the player's gun in the given games and apply the damage, like BaseWeapon does for one shot.
+
+        :return: (damage dealt - negative when the shooter hit itself, distance to the tank hit or aimed at,
+                  impact x) per game
+        """
+        enemy = 1 - player
+        start_x, start_y = cannon_tip(self._tank_x[games, player], self._tank_y[games, player],
+                                      self._angle[games, player])
+        impact_x, impact_y, out_of_map = resolve_shots(self._heights[games], start_x, start_y,
+                                                       self._angle[games, player], self._power[games, player])
+
+        source_distance = np.sqrt((self._tank_x[games, player] - impact_x)**2 +
+                                  (self._tank_y[games, player] - impact_y)**2)
+        enemy_distance = np.sqrt((self._tank_x[games, enemy] - impact_x)**2 +
+                                 (self._tank_y[games, enemy] - impact_y)**2)
+
+        # Out of the map counts as nothing, otherwise hitting yourself comes before hitting the enemy
+        hit_source = ~out_of_map & (source_distance <= DAMAGE_RADIUS)
+        hit_enemy = ~out_of_map & ~hit_source & (enemy_distance <= DAMAGE_RADIUS)
+        distance = np.where(out_of_map, 0.0, np.where(hit_source, source_distance, enemy_distance))
+        damage = np.where(hit_source | hit_enemy, (DAMAGE_RADIUS - distance) * DAMAGE_MULTIPLIER, 0.0)
+
+        self._damage(games[hit_source], player, damage[hit_source])
+        self._damage(games[hit_enemy], enemy, damage[hit_enemy])
+
+        damage[hit_source] *= -1  # Make damage that we remember (-) if its on ourselves
+        return damage, distance, impact_x
+
+    def _damage(self, games, player, damage):
+        # Same rounding as Tank.damage()
+        damage = np.trunc(damage).astype(np.int64)
+        health = self._health[games, player]
+        self._health[games, player] = np.where(health >= damage, health - damage, 0)
+
+    def _calculate_reward(self, damage, distance):
+        # Simulation._calculate_reward() for the ML's own shots
+        reward = np.where(damage < 0, 0.1, NOMINAL_REWARD + damage)
+        distance_normalized = distance / float(self.size[X])
+        return np.where(damage >= 0, reward * (1 - distance_normalized), reward)
+
+    def _observe(self):
+        states = self._states
+        states[:, StateEnum.TANK1_LOCATION_X] = self._tank_x[:, PLAYER_1]
+        states[:, StateEnum.TANK1_LOCATION_Y] = self._tank_y[:, PLAYER_1]
+        states[:, StateEnum.TANK1_HEALTH] = self._health[:, PLAYER_1]
+        states[:, StateEnum.TANK1_POWER] = self._power[:, PLAYER_1]
+        states[:, StateEnum.TANK1_ANGLE] = self._angle[:, PLAYER_1]
+        states[:, StateEnum.TANK2_LOCATION_X] = self._tank_x[:, PLAYER_2]
+        states[:, StateEnum.TANK2_LOCATION_Y] = self._tank_y[:, PLAYER_2]
+        states[:, StateEnum.TANK2_HEALTH] = self._health[:, PLAYER_2]
+        states[:, StateEnum.TANK2_POWER] = self._power[:, PLAYER_2]
+        states[:, StateEnum.TANK2_ANGLE] = self._angle[:, PLAYER_2]
+        return states